@@ -0,0 +1,64 @@
+"""
+rows/s of the iterrows record builder vs db.db_records.df_to_records
+python3 -m benchmarks.bench_db_records [n_tickers] [n_days]
+uses data/R1K/mkt_data.pq when available, otherwise a synthetic frame of the same shape
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+import db.db_records as db_records
+
+def load_frames(n_tickers, n_days):
+    try:
+        mkt_data = pd.read_parquet("data/R1K/mkt_data.pq")
+        tickers = mkt_data.index.get_level_values(1).unique()[:n_tickers]
+        frames = []
+        for ticker in tickers:
+            df = mkt_data.xs(ticker, level=1).reset_index()
+            df = df.rename(columns={df.columns[0]: "datetime"})
+            frames.append(df)
+        return frames
+    except Exception:
+        pass
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=n_days)
+    frames = []
+    for _ in range(n_tickers):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_days)))
+        df = pd.DataFrame({
+            "datetime": dates,
+            "open": close * (1 + rng.normal(0, 0.005, n_days)),
+            "high": close * 1.01,
+            "low": close * 0.99,
+            "close": close,
+            "adj_close": close,
+            "volume": rng.integers(1e5, 1e7, n_days),
+        })
+        df.loc[rng.random(n_days) < 0.01, "open"] = np.nan
+        frames.append(df)
+    return frames
+
+def iterrows_records(df, series_metadata):
+    return [{**row.dropna().to_dict(), **{"metadata": series_metadata}} for index,row in df.iterrows()]
+
+def run(builder, frames):
+    start = time.perf_counter()
+    n_rows = 0
+    for i, df in enumerate(frames):
+        n_rows += len(builder(df, {"ticker": str(i), "source": "eodhistoricaldata"}))
+    elapsed = time.perf_counter() - start
+    return n_rows, elapsed
+
+if __name__ == "__main__":
+    n_tickers = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    n_days = int(sys.argv[2]) if len(sys.argv) > 2 else 2520
+    frames = load_frames(n_tickers, n_days)
+
+    metadata = {"ticker": "0"}
+    assert iterrows_records(frames[0], metadata) == db_records.df_to_records(frames[0], metadata)
+
+    for name, builder in [("iterrows", iterrows_records), ("df_to_records", db_records.df_to_records)]:
+        n_rows, elapsed = run(builder, frames)
+        print("{:<14} {:>9} rows {:>8.3f}s {:>12,.0f} rows/s".format(name, n_rows, elapsed, n_rows / elapsed))
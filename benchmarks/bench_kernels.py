@@ -0,0 +1,122 @@
+"""
+parity and seconds of the groupby(level=1) indicators (with the minus_dm / rsi aliasing / lookback fixes) vs utils.kernels
+python3 -m benchmarks.bench_kernels [n_assets] [n_days] [lookback]
+synthetic (Date, Ticker) ohlcv panel, dense and with 3% of the rows dropped,
+kernels run with numba when installed and with numpy, numba timings are after the first call
+(compiled once and then loaded from numba's cache=True on disk cache by later processes)
+followed by numba vs numpy rolling_rank over the windows rank_ts is used with
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+import utils.kernels as kernels
+
+def make_panel(n_assets, n_days):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end="2023-06-30", periods=n_days)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_days, n_assets)), axis=0))
+    wide = {
+        "close": close,
+        "high": close * (1 + np.abs(rng.normal(0, 0.01, close.shape))),
+        "low": close * (1 - np.abs(rng.normal(0, 0.01, close.shape))),
+        "volume": rng.integers(1e5, 1e7, close.shape).astype(float),
+    }
+    index = pd.MultiIndex.from_product([dates, ["T{}".format(i) for i in range(n_assets)]], names=["Date", "Ticker"])
+    return pd.DataFrame({key: value.ravel() for key, value in wide.items()}, index=index)
+
+def sparsify(df, fraction=0.03):
+    rng = np.random.default_rng(1)
+    return df[rng.random(len(df)) >= fraction]
+
+def reference_adx(df, lookback, smooth=True):
+    plus_dm = df['high'].groupby(level=1).diff()
+    minus_dm = df['low'].groupby(level=1).diff()
+    plus_dm[plus_dm < 0] = 0
+    minus_dm[minus_dm > 0] = 0
+    prev_close = df['close'].groupby(level=1).shift(1)
+    tr = pd.concat([df['high'] - df['low'], abs(df['high'] - prev_close), abs(df['low'] - prev_close)], axis=1).max(axis=1)
+    atr = tr.groupby(level=1).rolling(lookback).mean().droplevel(0)
+    plus_di = 100 * (plus_dm.groupby(level=1).ewm(alpha=1/lookback).mean().droplevel(0) / atr)
+    minus_di = abs(100 * (minus_dm.groupby(level=1).ewm(alpha=1/lookback).mean().droplevel(0) / atr))
+    dx = (abs(plus_di - minus_di) / abs(plus_di + minus_di)) * 100
+    adx = ((dx.groupby(level=1).shift(1) * (lookback - 1)) + dx) / lookback
+    return adx.groupby(level=1).ewm(alpha=1/lookback).mean().droplevel(0) if smooth else adx
+
+def reference_mvwap(df, lookback):
+    tp = df[['close','high','low']].mean(1)
+    tpv_cum = (tp * df['volume']).groupby(level=1).rolling(lookback).sum().droplevel(0)
+    return tpv_cum / df['volume'].groupby(level=1).rolling(lookback).sum().droplevel(0)
+
+def reference_rsi(df, lookback):
+    ret = df['close'].groupby(level=1).pct_change()
+    up = ret.clip(lower=0)
+    down = ret.clip(upper=0).abs()
+    up = up.groupby(level=1).ewm(alpha=1/lookback).mean().droplevel(0)
+    down = down.groupby(level=1).ewm(alpha=1/lookback).mean().droplevel(0)
+    return 100 - (100 / (1 + up / down))
+
+def reference_rank(df, col, lookback):
+    return df[col].unstack().rolling(lookback).rank(pct=True)
+
+def wide_kernels(df, lookback, use_numba):
+    close, layout = kernels.to_wide(df['close'], compact=True)
+    high, _ = kernels.to_wide(df['high'], compact=True)
+    low, _ = kernels.to_wide(df['low'], compact=True)
+    volume, _ = kernels.to_wide(df['volume'], compact=True)
+    dated_close, _ = kernels.to_wide(df['close'])
+    return layout, {
+        "adx": lambda: kernels.adx(high, low, close, lookback, use_numba=use_numba),
+        "mvwap": lambda: kernels.mvwap(close, high, low, volume, lookback, use_numba=use_numba),
+        "rsi": lambda: kernels.rsi(close, lookback, use_numba=use_numba),
+        "rank": lambda: kernels.rolling_rank(dated_close, lookback, use_numba=use_numba),
+    }
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def check(df, lookback, label):
+    references = {
+        "adx": lambda: reference_adx(df, lookback),
+        "mvwap": lambda: reference_mvwap(df, lookback),
+        "rsi": lambda: reference_rsi(df, lookback),
+        "rank": lambda: reference_rank(df, "close", lookback),
+    }
+    expected = {}
+    for name, fn in references.items():
+        expected[name], elapsed = timed(fn)
+        print("{:<6} {:<6} groupby   {:>8.3f}s".format(label, name, elapsed))
+
+    for use_numba in ([True, False] if kernels.numba is not None else [False]):
+        layout, fns = wide_kernels(df, lookback, use_numba)
+        if use_numba:
+            for fn in fns.values():
+                fn()
+        for name, fn in fns.items():
+            result, elapsed = timed(fn)
+            if name == "rank":
+                np.testing.assert_allclose(result, expected[name].to_numpy(), rtol=1e-9, atol=1e-12)
+            else:
+                np.testing.assert_allclose(kernels.to_long(result, layout).to_numpy(), expected[name].reindex(df.index).to_numpy(), rtol=1e-7, atol=1e-9)
+            print("{:<6} {:<6} {:<9} {:>8.3f}s".format(label, name, "numba" if use_numba else "numpy", elapsed))
+
+def rank_windows(df, windows=(5, 10, 20, 60, 252)):
+    close, _ = kernels.to_wide(df['close'])
+    for window in windows:
+        elapsed = {}
+        for use_numba in ([True, False] if kernels.numba is not None else [False]):
+            kernels.rolling_rank(close[:2 * window], window, use_numba=use_numba)
+            _, elapsed[use_numba] = timed(lambda: kernels.rolling_rank(close, window, use_numba=use_numba))
+        print("rank   w={:<4} {}".format(window, "  ".join("{} {:>7.3f}s".format("numba" if key else "numpy", value) for key, value in elapsed.items())))
+
+if __name__ == "__main__":
+    n_assets = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    n_days = int(sys.argv[2]) if len(sys.argv) > 2 else 2520
+    lookback = int(sys.argv[3]) if len(sys.argv) > 3 else 14
+    df = make_panel(n_assets, n_days)
+    check(df, lookback, "dense")
+    check(sparsify(df), lookback, "sparse")
+    rank_windows(df)
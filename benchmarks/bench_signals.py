@@ -0,0 +1,82 @@
+"""
+per-step seconds of the notebook rank/ppf/threshold/GICS-center/normalize chain vs utils.signals.build_signal
+python3 -m benchmarks.bench_signals [n_assets] [n_days] [thresh]
+synthetic R1K-shaped panel with a presence mask, static and time varying sector groups
+"""
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from scipy.stats import norm
+
+import utils.signals as signals
+
+def center(x):
+    mean = x.mean(1)
+    x = x.sub(mean,0)
+    return x
+
+def make_panel(n_assets, n_days):
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range(end="2023-06-30", periods=n_days)
+    assets = ["T{}".format(i) for i in range(n_assets)]
+    alpha = pd.DataFrame(rng.normal(size=(n_days, n_assets)), index=dates, columns=assets)
+    alpha = alpha.mask(rng.random((n_days, n_assets)) < 0.02).round(2)
+    P = pd.DataFrame(rng.random((n_days, n_assets)) > 0.1, index=dates, columns=assets)
+    sectors = pd.Series(rng.choice(["S{}".format(i) for i in range(11)], n_assets), index=assets)
+    GICS = pd.DataFrame(np.tile(sectors.to_numpy(), (n_days, 1)), index=dates, columns=assets)
+    GICS.iloc[n_days // 2:, :n_assets // 10] = "S0"
+    return alpha, P, sectors, GICS
+
+def notebook_static(alpha, P, sectors, thresh, timings):
+    start = time.perf_counter()
+    SIGNAL = alpha[P].rank(1,pct=True,ascending=True)
+    timings["rank"] = time.perf_counter() - start
+    start = time.perf_counter()
+    SIGNAL = SIGNAL.clip(0.01,0.99).apply(norm.ppf)
+    timings["ppf"] = time.perf_counter() - start
+    start = time.perf_counter()
+    SIGNAL[SIGNAL.abs()<thresh] = None
+    timings["threshold"] = time.perf_counter() - start
+    start = time.perf_counter()
+    SIGNAL = SIGNAL[P].T.groupby(sectors).apply(lambda x: center(x.T).T).droplevel(0).T
+    timings["demean"] = time.perf_counter() - start
+    start = time.perf_counter()
+    SIGNAL = SIGNAL.div(SIGNAL.abs().sum(1),0)
+    timings["normalize"] = time.perf_counter() - start
+    return SIGNAL
+
+def notebook_time_varying(alpha, P, GICS, thresh, timings):
+    start = time.perf_counter()
+    SIGNAL = alpha[P].rank(1,pct=True,ascending=True).clip(0.01,0.99).apply(norm.ppf)
+    SIGNAL[SIGNAL.abs()<thresh] = None
+    for gics in GICS.stack().unique():
+        SIGNAL[GICS == gics]= SIGNAL[GICS == gics].sub(SIGNAL[GICS==gics].mean(1),0)
+    SIGNAL= SIGNAL.div(SIGNAL.abs().sum(1),0)
+    timings["chain"] = time.perf_counter() - start
+    return SIGNAL
+
+def report(name, timings):
+    steps = " ".join("{}={:.3f}s".format(step, seconds) for step, seconds in timings.items())
+    print("{:<22} total={:.3f}s {}".format(name, sum(timings.values()), steps))
+
+if __name__ == "__main__":
+    n_assets = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_days = int(sys.argv[2]) if len(sys.argv) > 2 else 2520
+    thresh = float(sys.argv[3]) if len(sys.argv) > 3 else 0.25
+    alpha, P, sectors, GICS = make_panel(n_assets, n_days)
+
+    pandas_timings, numpy_timings = {}, {}
+    expected = notebook_static(alpha, P, sectors, thresh, pandas_timings)
+    result = signals.build_signal(alpha, P=P, groups=sectors, thresh=thresh, timings=numpy_timings)
+    pd.testing.assert_frame_equal(result, expected.reindex_like(result), check_freq=False)
+    report("notebook static", pandas_timings)
+    report("build_signal static", numpy_timings)
+
+    pandas_timings, numpy_timings = {}, {}
+    expected = notebook_time_varying(alpha, P, GICS, thresh, pandas_timings)
+    result = signals.build_signal(alpha, P=P, groups=GICS, thresh=thresh, timings=numpy_timings)
+    pd.testing.assert_frame_equal(result, expected, check_freq=False)
+    report("notebook time varying", pandas_timings)
+    report("build_signal varying", numpy_timings)
@@ -0,0 +1,65 @@
+"""
+seconds to import data_master / utils.func, build DataMaster() and reach each service, every step in a fresh interpreter
+python3 -m benchmarks.bench_startup [repeats]
+DataMaster is given a throwaway config with dummy keys, services whose dependencies are not installed are reported as such
+"""
+import os
+import sys
+import json
+import tempfile
+import subprocess
+
+STEP = """
+import time, json
+start = time.perf_counter()
+{setup}
+setup = time.perf_counter()
+{step}
+print(json.dumps({{"setup": setup - start, "step": time.perf_counter() - setup}}))
+"""
+
+DEPENDENCIES = ["eod", "fredapi", "oandapyV20", "cif", "dbnomics", "sec_edgar_api", "motor", "pymongo", "scipy.stats"]
+SERVICES = ["equities", "baskets", "crypto", "commodities", "options", "misc", "macro", "fx"]
+
+def run_step(setup, step):
+    code = STEP.format(setup=setup, step=step)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=os.getcwd())
+    if proc.returncode != 0:
+        return None, proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"
+    return json.loads(proc.stdout.strip().splitlines()[-1])["step"], None
+
+def timed_step(name, setup, step, repeats):
+    times, error = [], None
+    for _ in range(repeats):
+        elapsed, error = run_step(setup, step)
+        if elapsed is None:
+            break
+        times.append(elapsed)
+    if times:
+        print("{:<34} {:>8.3f}s".format(name, min(times)))
+    else:
+        print("{:<34} {:>9}  {}".format(name, "n/a", error))
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as f:
+        json.dump({key: "dummy" for key in [
+            "eod_key", "fred_key", "mongo_db", "mongo_user", "mongo_pw", "mongo_cluster", "oan_acc_id", "oan_token", "oan_env"
+        ]}, f)
+        config = f.name
+    try:
+        print("deferred dependencies (import cost paid only by the services using them)")
+        for module in DEPENDENCIES:
+            timed_step("  import " + module, "", "import " + module, repeats)
+
+        print("startup")
+        timed_step("  import data_master", "", "import data_master", repeats)
+        timed_step("  DataMaster()", "import data_master", "data_master.DataMaster({!r})".format(config), repeats)
+        timed_step("  import utils.func", "", "import utils.func", repeats)
+
+        print("first access")
+        setup = "import data_master\nmaster = data_master.DataMaster({!r})".format(config)
+        for service in SERVICES:
+            timed_step("  master." + service, setup, "master." + service, repeats)
+    finally:
+        os.remove(config)
@@ -3,24 +3,57 @@ import sys
 import json
 import datetime
 import asyncio
-
-import pandas as pd
-import oandapyV20 as Oanda
-
-from fredapi import Fred
-from eod import EodHistoricalData
+import importlib
+import threading
 
 import db_logs
-import securities.fx as fx
-import securities.misc as misc
-import securities.macro as macro
-import securities.crypto as crypto
-import securities.baskets as baskets
-import securities.options as options
-import securities.equities as equities
-import securities.commodities as commodities
-# import securities.fixed_income as fixed_income
-import db.db_service as db_service
+
+"""
+services and clients are built on first access, their modules (oandapyV20, fredapi, cif, dbnomics, sec_edgar_api...)
+are only imported then, so DataMaster() itself only reads the config
+the optional "db_config" section is handed to DbService with "root" set to the config file's directory, e.g.
+{"db_config": {"ohlcv_cache": {"directory": "data/ohlcv_cache"}}} turns the local ohlcv cache on under that root,
+{"db_config": {"fundamentals_cache": {"read_db": true, "insert_db": true}}} puts mongo behind the fundamentals cache
+"""
+SERVICES = {
+    "fx": ("securities.fx", "FX"),
+    "misc": ("securities.misc", "Miscellaneous"),
+    "macro": ("securities.macro", "Macro"),
+    "crypto": ("securities.crypto", "Crypto"),
+    "commodities": ("securities.commodities", "Commodities"),
+    "baskets": ("securities.baskets", "Baskets"),
+    "equities": ("securities.equities", "Equities"),
+    "fixed_income": ("securities.fixed_income", "FixedIncome"),
+    "options": ("securities.options", "Options"),
+}
+
+def _eod_client():
+    return importlib.import_module("eod").EodHistoricalData(os.getenv('EOD_KEY'))
+
+def _fred_client():
+    return importlib.import_module("fredapi").Fred(api_key=os.getenv("FRED_KEY"))
+
+def _oanda_client():
+    if not os.getenv('OAN_TOKEN') or not os.getenv('OAN_ENV'):
+        raise RuntimeError("oanda is not configured, set oan_token and oan_env in the DataMaster config")
+    return importlib.import_module("oandapyV20").API(access_token=os.environ['OAN_TOKEN'], environment=os.environ['OAN_ENV'])
+
+CLIENTS = {
+    "eod_client": _eod_client,
+    "fred_client": _fred_client,
+    "oanda_client": _oanda_client,
+}
+
+class LazyClients(dict):
+    """
+    data_clients dict whose entries are constructed the first time a service indexes them
+    """
+    def __missing__(self, key):
+        if key not in CLIENTS:
+            raise KeyError(key)
+        client = CLIENTS[key]()
+        self[key] = client
+        return client
 
 class DataMaster:
 
@@ -36,25 +69,37 @@ class DataMaster:
             os.environ['OAN_ID'] = config["oan_acc_id"]
             os.environ['OAN_TOKEN'] = config["oan_token"]
             os.environ['OAN_ENV'] = config["oan_env"]
-
-        self.eod_client = EodHistoricalData(os.getenv('EOD_KEY'))
-        self.fred_client = Fred(api_key=os.getenv("FRED_KEY"))
-        self.oanda_client = "okok"#Oanda.API(access_token=os.environ['OAN_TOKEN'], environment=os.environ['OAN_ENV'])
-        self.data_clients = {
-            "eod_client": self.eod_client,
-            "fred_client": self.fred_client,
-            "oanda_client": self.oanda_client
-        }
-        self.db_service = db_service.DbService()
-        self.fx = fx.FX(data_clients=self.data_clients, db_service=self.db_service)
-        self.misc = misc.Miscellaneous(data_clients=self.data_clients, db_service=self.db_service)
-        self.macro = macro.Macro(data_clients=self.data_clients, db_service=self.db_service)
-        self.crypto = crypto.Crypto(data_clients=self.data_clients, db_service=self.db_service)
-        self.commodities = commodities.Commodities(data_clients=self.data_clients, db_service=self.db_service)
-        self.baskets = baskets.Baskets(data_clients=self.data_clients, db_service=self.db_service)
-        self.equities = equities.Equities(data_clients=self.data_clients, db_service=self.db_service)
-        # self.fixed_income = fixed_income.FixedIncome(data_clients=self.data_clients, db_service=self.db_service)
-        self.options = options.Options(data_clients=self.data_clients, db_service=self.db_service)
+            self.db_config = dict(config.get("db_config", {}))
+            self.db_config.setdefault("root", os.path.dirname(os.path.abspath(config_file_path)))
+
+        self.data_clients = LazyClients()
+        self._db_service = None
+        self._services = {}
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        # only called for attributes not set in __init__: services and clients
+        if name in SERVICES:
+            return self._get_service(name)
+        if name in CLIENTS:
+            return self.__dict__["data_clients"][name]
+        raise AttributeError(name)
+
+    @property
+    def db_service(self):
+        with self._lock:
+            if self._db_service is None:
+                self._db_service = importlib.import_module("db.db_service").DbService(db_config=self.db_config)
+            return self._db_service
+
+    def _get_service(self, name):
+        with self._lock:
+            if name not in self._services:
+                module_name, class_name = SERVICES[name]
+                service_class = getattr(importlib.import_module(module_name), class_name)
+                self._services[name] = service_class(data_clients=self.data_clients, db_service=self.db_service)
+                db_logs.DBLogs().info("DataMaster built {} service".format(name))
+            return self._services[name]
 
     def get_fx_service(self):
         return self.fx
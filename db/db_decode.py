@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+try:
+    from pymongoarrow.api import Schema, find_arrow_all
+except ImportError:
+    Schema, find_arrow_all = None, None
+
+OHLCV_FIELDS = ["open", "high", "low", "close", "adj_close", "volume"]
+
+def get_projection(fields):
+    projection = {"_id": 0, "datetime": 1}
+    projection.update({field: 1 for field in fields})
+    return projection
+
+def columns_to_frame(datetimes, columns, fields, index_datetime=True):
+    df = pd.DataFrame(
+        {field: np.asarray(columns[field], dtype=np.float64) for field in fields},
+        index=pd.DatetimeIndex(np.asarray(datetimes, dtype="datetime64[ns]"), name="datetime")
+    )
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(kind="stable")
+    return df if index_datetime else df.reset_index()
+
+def _arrow_to_frame(table, fields, index_datetime=True):
+    datetimes = table.column("datetime").to_numpy()
+    columns = {field: table.column(field).to_numpy(zero_copy_only=False) for field in fields}
+    return columns_to_frame(datetimes, columns, fields, index_datetime=index_datetime)
+
+def decode_docs(docs, fields, index_datetime=True):
+    datetimes = []
+    columns = {field: [] for field in fields}
+    for doc in docs:
+        datetimes.append(doc["datetime"])
+        for field in fields:
+            value = doc.get(field)
+            columns[field].append(np.nan if value is None else value)
+    return columns_to_frame(datetimes, columns, fields, index_datetime=index_datetime)
+
+def find_frame(collection, query, fields=OHLCV_FIELDS, index_datetime=True):
+    """
+    typed, datetime indexed frame of the projected fields, decoded without building a DataFrame of documents
+    uses pymongoarrow schema decoding when installed
+    """
+    if find_arrow_all is not None:
+        schema = Schema({"datetime": pa.timestamp("ms"), **{field: pa.float64() for field in fields}})
+        return _arrow_to_frame(find_arrow_all(collection, query, schema=schema), fields, index_datetime=index_datetime)
+    cursor = collection.find(query, projection=get_projection(fields), batch_size=10000)
+    return decode_docs(cursor, fields, index_datetime=index_datetime)
+
+async def asyn_find_frame(collection, query, fields=OHLCV_FIELDS, index_datetime=True):
+    datetimes = []
+    columns = {field: [] for field in fields}
+    async for doc in collection.find(query, projection=get_projection(fields), batch_size=10000):
+        datetimes.append(doc["datetime"])
+        for field in fields:
+            value = doc.get(field)
+            columns[field].append(np.nan if value is None else value)
+    return columns_to_frame(datetimes, columns, fields, index_datetime=index_datetime)
@@ -0,0 +1,84 @@
+import atexit
+import asyncio
+import threading
+import multiprocessing as mp
+import concurrent.futures
+
+import pyarrow as pa
+
+import db_logs
+import db.db_records as db_records
+
+def _df_to_buffer(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def _buffer_to_df(buffer):
+    return pa.ipc.open_stream(buffer).read_pandas()
+
+def _unroll_buffer(args):
+    return db_records.df_to_records(_buffer_to_df(args["buf"]), args["sm"])
+
+def _unroll_df(args):
+    return db_records.df_to_records(args["df"], args["sm"])
+
+class RecordsExecutor():
+    """
+    long lived pool turning DataFrames into timeseries records, owned by DbService
+    mode="process": frames are shipped to the workers as Arrow IPC buffers instead of pickled DataFrames
+    mode="thread": frames are shared with the workers as is
+    mode="inline": records are built on the calling thread
+    the pool is created on first use and shut down by shutdown() or at interpreter exit
+    """
+    MODES = ["process", "thread", "inline"]
+
+    def __init__(self, mode="process", max_workers=None):
+        assert(mode in RecordsExecutor.MODES)
+        self.mode = mode
+        self.max_workers = max_workers if max_workers else mp.cpu_count()
+        self._executor = None
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.mode == "process":
+                    self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+                db_logs.DBLogs().info("started RecordsExecutor {} x{}".format(self.mode, self.max_workers))
+            return self._executor
+
+    def _tasks(self, dfs, series_metadatas):
+        if self.mode == "process":
+            return _unroll_buffer, [{"buf": _df_to_buffer(dfs[i]), "sm": series_metadatas[i]} for i in range(len(dfs))]
+        return _unroll_df, [{"df": dfs[i], "sm": series_metadatas[i]} for i in range(len(dfs))]
+
+    def map_records(self, dfs, series_metadatas):
+        if not dfs:
+            return []
+        if self.mode == "inline":
+            return [db_records.df_to_records(dfs[i], series_metadatas[i]) for i in range(len(dfs))]
+        fn, tasks = self._tasks(dfs, series_metadatas)
+        return list(self._get_executor().map(fn, tasks))
+
+    async def asyn_map_records(self, dfs, series_metadatas):
+        if not dfs:
+            return []
+        if self.mode == "inline":
+            return self.map_records(dfs, series_metadatas)
+        fn, tasks = self._tasks(dfs, series_metadatas)
+        executor = self._get_executor()
+        return await asyncio.gather(*[
+            asyncio.wrap_future(executor.submit(fn, task)) for task in tasks
+        ])
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+def _column_values(series):
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series.astype(object).tolist()
+    return series.to_numpy().tolist()
+
+def df_to_records(df, series_metadata={}):
+    """
+    columnar equivalent of [{**row.dropna().to_dict(), **{"metadata": series_metadata}} for index,row in df.iterrows()]
+    each column is converted to python objects once, NaN fields are dropped per row using a precomputed mask
+    """
+    if len(df) == 0:
+        return []
+    columns = list(df.columns)
+    values = [_column_values(df[col]) for col in columns]
+    masks = df.notna().to_numpy()
+    complete_rows = masks.all(axis=1)
+
+    records = []
+    if complete_rows.all():
+        for row in zip(*values):
+            record = dict(zip(columns, row))
+            record["metadata"] = series_metadata
+            records.append(record)
+        return records
+
+    for i, row in enumerate(zip(*values)):
+        if complete_rows[i]:
+            record = dict(zip(columns, row))
+        else:
+            row_mask = masks[i]
+            record = {columns[j]: row[j] for j in np.flatnonzero(row_mask)}
+        record["metadata"] = series_metadata
+        records.append(record)
+    return records
@@ -0,0 +1,63 @@
+import threading
+
+import db_logs
+
+class CollectionRegistry():
+    """
+    in-process view of the collections in the mongo db and their types, so that _ensure_coll
+    does not need a list_collection_names round trip on every read and write
+    {name: {"type": "timeseries"|"regular", "granularity": "hours"|...|None}}
+    """
+    COLL_FILTER = {"name": {"$regex": r"^(?!system\.)"}}
+
+    def __init__(self):
+        self._collections = {}
+        self._warm = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _parse_info(info):
+        timeseries = info.get("options", {}).get("timeseries")
+        if info.get("type") == "timeseries" or timeseries:
+            return {"type": "timeseries", "granularity": (timeseries or {}).get("granularity")}
+        return {"type": "regular", "granularity": None}
+
+    def is_warm(self):
+        return self._warm
+
+    def warm(self, mongo_db):
+        collections = {info["name"]: CollectionRegistry._parse_info(info) for info in mongo_db.list_collections(filter=CollectionRegistry.COLL_FILTER)}
+        with self._lock:
+            self._collections = collections
+            self._warm = True
+        db_logs.DBLogs().info("warmed collection registry with {} collections".format(len(collections)))
+
+    async def asyn_warm(self, asyn_mongo_db):
+        collections = {}
+        async for info in await asyn_mongo_db.list_collections(filter=CollectionRegistry.COLL_FILTER):
+            collections[info["name"]] = CollectionRegistry._parse_info(info)
+        with self._lock:
+            self._collections = collections
+            self._warm = True
+        db_logs.DBLogs().info("warmed collection registry with {} collections".format(len(collections)))
+
+    def get(self, name):
+        with self._lock:
+            return self._collections.get(name)
+
+    def register(self, name, coll_type="regular", granularity=None):
+        with self._lock:
+            self._collections[name] = {"type": coll_type, "granularity": granularity}
+
+    def discard(self, name):
+        with self._lock:
+            self._collections.pop(name, None)
+
+    def invalidate(self):
+        with self._lock:
+            self._collections = {}
+            self._warm = False
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._collections
@@ -6,22 +6,33 @@ import pandas as pd
 import datetime
 import asyncio
 import db_logs
-import threading
+import db.db_records as db_records
+import db.db_executor as db_executor
+import db.db_registry as db_registry
+import db.db_decode as db_decode
 import motor.motor_asyncio
-import multiprocessing as mp
 
 from pymongo import UpdateOne
+from pymongo.errors import CollectionInvalid
 from collections import defaultdict
 
 class DbService():
 
     def __init__(self, db_config={}):
         self.db_config = db_config
+        self.records_executor = db_executor.RecordsExecutor(
+            mode=db_config.get("records_executor", "process"), 
+            max_workers=db_config.get("records_executor_workers", None)
+        )
+        self.coll_registry = db_registry.CollectionRegistry()
         # self.mongo_cluster = pymongo.MongoClient(os.getenv("MONGO_CLUSTER"))        
         # self.mongo_db = self.mongo_cluster[os.getenv("MONGO_DB")]
         # self.asyn_mongo_cluster = motor.motor_asyncio.AsyncIOMotorClient(os.getenv("MONGO_CLUSTER"))
         # self.asyn_mongo_db = self.asyn_mongo_cluster[os.getenv("MONGO_DB")]
     
+    def close(self):
+        self.records_executor.shutdown()
+
     def _get_coll_name(self, dtype, dformat, dfreq):
         return "{}_{}_{}".format(dtype, dformat, dfreq)
 
@@ -37,27 +48,99 @@ class DbService():
     async def _asyn_get_collection_meta(self, dtype, dformat, dfreq):
         return self.asyn_mongo_db["{}-meta".format(self._get_coll_name(dtype, dformat, dfreq))]
 
+    def warm_coll_registry(self):
+        self.coll_registry.warm(self.mongo_db)
+
+    async def asyn_warm_coll_registry(self):
+        await self.coll_registry.asyn_warm(self.asyn_mongo_db)
+
     def _ensure_coll(self, dtype, dformat, dfreq, coll_type="timeseries", granularity="hours"):
-        filter = {"name": {"$regex": r"^(?!system\.)"}}
-        names = self.mongo_db.list_collection_names(filter=filter)   
-        exists = self._get_coll_name(dtype=dtype, dformat=dformat, dfreq=dfreq) in names
-        if not exists and (coll_type == "timeseries"):
-            self.mongo_db.create_collection(
-                "{}_{}_{}".format(dtype, dformat, dfreq), 
-                timeseries={ 'timeField': 'datetime', 'metaField': 'metadata', 'granularity': granularity },
-                check_exists=True
-            )
-            self.mongo_db.drop_collection("{}_{}_{}-meta".format(dtype, dformat, dfreq))
-            self.mongo_db.create_collection(
-                "{}_{}_{}-meta".format(dtype, dformat, dfreq)
-            )
-        if not exists and coll_type == "regular":
-            self.mongo_db.create_collection(
-                "{}_{}_{}".format(dtype, dformat, dfreq), 
-                check_exists=True
-            )
+        if not self.coll_registry.is_warm():
+            self.warm_coll_registry()
+        coll_name = self._get_coll_name(dtype=dtype, dformat=dformat, dfreq=dfreq)
+        if coll_name in self.coll_registry:
+            return True
+        if coll_type == "timeseries":
+            try:
+                self.mongo_db.create_collection(
+                    coll_name, 
+                    timeseries={ 'timeField': 'datetime', 'metaField': 'metadata', 'granularity': granularity },
+                    check_exists=True
+                )
+                self.mongo_db.drop_collection("{}-meta".format(coll_name))
+                self.mongo_db.create_collection(
+                    "{}-meta".format(coll_name)
+                )
+            except CollectionInvalid:
+                db_logs.DBLogs().warning("_ensure_coll found existing collection {}".format(coll_name))
+            self.coll_registry.register(coll_name, coll_type="timeseries", granularity=granularity)
+            self.coll_registry.register("{}-meta".format(coll_name), coll_type="regular")
+        if coll_type == "regular":
+            try:
+                self.mongo_db.create_collection(
+                    coll_name, 
+                    check_exists=True
+                )
+            except CollectionInvalid:
+                db_logs.DBLogs().warning("_ensure_coll found existing collection {}".format(coll_name))
+            self.coll_registry.register(coll_name, coll_type="regular")
         return True
 
+    async def _asyn_ensure_coll(self, dtype, dformat, dfreq, coll_type="timeseries", granularity="hours"):
+        if not self.coll_registry.is_warm():
+            await self.asyn_warm_coll_registry()
+        coll_name = self._get_coll_name(dtype=dtype, dformat=dformat, dfreq=dfreq)
+        if coll_name in self.coll_registry:
+            return True
+        if coll_type == "timeseries":
+            try:
+                await self.asyn_mongo_db.create_collection(
+                    coll_name, 
+                    timeseries={ 'timeField': 'datetime', 'metaField': 'metadata', 'granularity': granularity },
+                    check_exists=True
+                )
+                await self.asyn_mongo_db.drop_collection("{}-meta".format(coll_name))
+                await self.asyn_mongo_db.create_collection(
+                    "{}-meta".format(coll_name)
+                )
+            except CollectionInvalid:
+                db_logs.DBLogs().warning("_asyn_ensure_coll found existing collection {}".format(coll_name))
+            self.coll_registry.register(coll_name, coll_type="timeseries", granularity=granularity)
+            self.coll_registry.register("{}-meta".format(coll_name), coll_type="regular")
+        if coll_type == "regular":
+            try:
+                await self.asyn_mongo_db.create_collection(
+                    coll_name, 
+                    check_exists=True
+                )
+            except CollectionInvalid:
+                db_logs.DBLogs().warning("_asyn_ensure_coll found existing collection {}".format(coll_name))
+            self.coll_registry.register(coll_name, coll_type="regular")
+        return True
+
+    @staticmethod
+    def _identifier_key(identifier, keys):
+        return tuple((k, identifier[k]) for k in keys)
+
+    @staticmethod
+    def _match_identifiers(identifiers, docs):
+        """
+        matched[i] = [doc for doc in docs if identifiers[i].items() <= doc.items()]
+        docs are hashed once per distinct identifier key set instead of scanned once per identifier
+        """
+        indexes = {}
+        matched = []
+        for identifier in identifiers:
+            keys = tuple(sorted(identifier.keys()))
+            if keys not in indexes:
+                index = defaultdict(list)
+                for doc in docs:
+                    if all(k in doc for k in keys):
+                        index[DbService._identifier_key(doc, keys)].append(doc)
+                indexes[keys] = index
+            matched.append(indexes[keys].get(DbService._identifier_key(identifier, keys), []))
+        return matched
+
     def _check_contiguous_series(self, record_start, record_end, new_start, new_end):
         return new_start <= record_end and record_start <= new_end
 
@@ -70,7 +153,7 @@ class DbService():
         df = df.loc[df["datetime"] >=  datetime.datetime(1970, 2, 1)]
 
         self._ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="timeseries")
-        records = [{**row.dropna().to_dict(), **{"metadata": series_metadata}} for index,row in df.iterrows()]
+        records = db_records.df_to_records(df, series_metadata)
         series_start = records[0]["datetime"]
         series_end = records[-1]["datetime"]
         meta_series_count = self._get_collection_meta(dtype, dformat, dfreq).count_documents(series_identifier)
@@ -90,8 +173,8 @@ class DbService():
             new_head = df.loc[df["datetime"] < meta_start]
             new_tail = df.loc[df["datetime"] > meta_end]
             if len(new_head) + len(new_tail) > 0:
-                head_records =  [{**row.dropna().to_dict(), **{"metadata": series_metadata}} for index,row in new_head.iterrows()]
-                tail_records =  [{**row.dropna().to_dict(), **{"metadata": series_metadata}} for index,row in new_tail.iterrows()]
+                head_records = db_records.df_to_records(new_head, series_metadata)
+                tail_records = db_records.df_to_records(new_tail, series_metadata)
                 self._get_collection(dtype, dformat, dfreq).insert_many(head_records + tail_records, ordered=False)
                 self._get_collection_meta(dtype, dformat, dfreq).update_one(
                     series_identifier,
@@ -117,8 +200,8 @@ class DbService():
             return False
         df = df.loc[df["datetime"] >=  datetime.datetime(1970, 2, 1)]
 
-        self._ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="timeseries")
-        records = [{**row.dropna().to_dict(), **{"metadata": series_metadata}} for index,row in df.iterrows()]
+        await self._asyn_ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="timeseries")
+        records = db_records.df_to_records(df, series_metadata)
         series_start = records[0]["datetime"]
         series_end = records[-1]["datetime"]
         meta_series_count = await (await self._asyn_get_collection_meta(dtype, dformat, dfreq)).count_documents(series_identifier)
@@ -138,8 +221,8 @@ class DbService():
             new_head = df.loc[df["datetime"] < meta_start]
             new_tail = df.loc[df["datetime"] > meta_end]
             if len(new_head) + len(new_tail) > 0:
-                head_records =  [{**row.dropna().to_dict(), **{"metadata": series_metadata}} for index,row in new_head.iterrows()]
-                tail_records =  [{**row.dropna().to_dict(), **{"metadata": series_metadata}} for index,row in new_tail.iterrows()]
+                head_records = db_records.df_to_records(new_head, series_metadata)
+                tail_records = db_records.df_to_records(new_tail, series_metadata)
                 await (await self._asyn_get_collection(dtype, dformat, dfreq)).insert_many(head_records + tail_records, ordered=False)
                 await (await self._asyn_get_collection_meta(dtype, dformat, dfreq)).update_one(
                     series_identifier,
@@ -161,21 +244,14 @@ class DbService():
     def unroll_df(args):
         series_metadata = args["sm"]
         df = args["df"]
-        return [{**row.dropna().to_dict(), **{"metadata": series_metadata}} for index,row in df.iterrows()]
+        return db_records.df_to_records(df, series_metadata)
 
     async def asyn_batch_insert_timeseries_df(self, dtype="equity", dformat="spot", dfreq="1d", 
                             dfs=[], series_metadatas=[], series_identifiers=[], metalogs=[]):
 
         dfs = [df.loc[df["datetime"] >= datetime.datetime(1970, 2, 1)] for df in dfs]
-        self._ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="timeseries")
-        recordss = []
-        series_starts = []
-        series_ends = []
-
-        with mp.Manager() as manager:
-            with mp.Pool(mp.cpu_count()) as pool:
-                recordss = pool.map(DbService.unroll_df, [{"i": i, "sm" : series_metadatas[i], "df": dfs[i]} for i in range(len(dfs))])
-        
+        await self._asyn_ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="timeseries")
+        recordss = await self.records_executor.asyn_map_records(dfs, series_metadatas)
         series_starts = [records[0]["datetime"] for records in recordss]
         series_ends = [records[-1]["datetime"] for records in recordss]
 
@@ -184,18 +260,12 @@ class DbService():
             async for i in (await self._asyn_get_collection_meta(dtype, dformat, dfreq)).find({"$or" : series_identifiers}):
                 docs.append(i)        
         
-        meta_records = []
-        for series_identifier in series_identifiers:
-            matched = []
-            for doc in docs:
-                if series_identifier.items() <= doc.items():
-                    matched.append(doc)
-            meta_records.append(matched)
+        meta_records = DbService._match_identifiers(series_identifiers, docs)
 
         new_inserts_seriess = []
         new_inserts_series_metas = []
         new_updates_series_metas = []
-        update_identifers, new_heads, new_tails, time_starts, time_ends = [], [], [], [], []
+        update_identifers, update_metadatas, new_heads, new_tails, time_starts, time_ends = [], [], [], [], [], []
         for i in range(len(series_identifiers)):
             matched = meta_records[i]
             if len(matched) == 0:
@@ -230,28 +300,26 @@ class DbService():
                     time_starts.append(min(series_starts[i], meta_start))
                     time_ends.append(max(series_ends[i], meta_end))
                     update_identifers.append(series_identifiers[i])
+                    update_metadatas.append(series_metadatas[i])
             else:
                 db_logs.DBLogs().critical("meta series corruption, series count gt 1 asyn_batch_insert_timeseries_df {}".format(metalogs[i]))
         
-        with mp.Manager() as manager:
-            with mp.Pool(mp.cpu_count()) as pool:
-                unrolled_heads = pool.map(DbService.unroll_df, [{"i": i, "sm" : update_identifers[i], "df": new_heads[i]} for i in range(len(new_heads))])
-                unrolled_tails = pool.map(DbService.unroll_df, [{"i": i, "sm" : update_identifers[i], "df": new_tails[i]} for i in range(len(new_tails))])
-                
-                for head_records in unrolled_heads:
-                    new_inserts_seriess.extend(head_records)
-                for tail_records in unrolled_tails:
-                    new_inserts_seriess.extend(tail_records)
-                for i in range(len(new_heads)):
-                    new_updates_series_metas.append(UpdateOne(
-                        update_identifers[i],
-                        {"$set": {
-                            "time_start": time_starts[i],
-                            "time_end": time_ends[i],
-                            "last_updated": datetime.datetime.utcnow(),
-                        }}
-                    ))
-   
+        unrolled_heads = await self.records_executor.asyn_map_records(new_heads, update_metadatas)
+        unrolled_tails = await self.records_executor.asyn_map_records(new_tails, update_metadatas)
+        for head_records in unrolled_heads:
+            new_inserts_seriess.extend(head_records)
+        for tail_records in unrolled_tails:
+            new_inserts_seriess.extend(tail_records)
+        for i in range(len(new_heads)):
+            new_updates_series_metas.append(UpdateOne(
+                update_identifers[i],
+                {"$set": {
+                    "time_start": time_starts[i],
+                    "time_end": time_ends[i],
+                    "last_updated": datetime.datetime.utcnow(),
+                }}
+            ))
+
         if new_inserts_seriess:
             await (await self._asyn_get_collection(dtype, dformat, dfreq)).insert_many(new_inserts_seriess, ordered=False)      
         if new_inserts_series_metas:
@@ -262,7 +330,19 @@ class DbService():
         db_logs.DBLogs().info("successful asyn_batch_insert_timeseries_df {}".format(metalogs))
         return True
 
-    def read_timeseries(self, dtype="equity", dformat="spot", dfreq="1d", period_start=None, period_end=None, series_metadata={}, series_identifier={}, metalogs=""):
+    def read_timeseries_meta(self, dtype="equity", dformat="spot", dfreq="1d", series_identifier={}):
+        """
+        the series' -meta doc (time_start, time_end, last_updated) or None
+        """
+        self._ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="timeseries")
+        return self._get_collection_meta(dtype, dformat, dfreq).find_one(series_identifier)
+
+    async def asyn_read_timeseries_meta(self, dtype="equity", dformat="spot", dfreq="1d", series_identifier={}):
+        await self._asyn_ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="timeseries")
+        return await (await self._asyn_get_collection_meta(dtype, dformat, dfreq)).find_one(series_identifier)
+
+    def read_timeseries(self, dtype="equity", dformat="spot", dfreq="1d", period_start=None, period_end=None, series_metadata={}, series_identifier={}, metalogs="", 
+                        fields=db_decode.OHLCV_FIELDS, index_datetime=False):
         self._ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="timeseries")
         period_start = max(period_start, datetime.datetime(1970, 2, 1))
         period_end = max(period_end, datetime.datetime(1970, 2, 1))
@@ -278,26 +358,30 @@ class DbService():
                 period_start = period_start.replace(hour=0, minute=0, second=0, microsecond=0)
                 period_end = period_end.replace(hour=0, minute=0, second=0, microsecond=0)
             series_filter = {"datetime" : {"$gte" : period_start, "$lte" :  period_end }}
-            records = list(self._get_collection(dtype, dformat, dfreq).find(
+            series_df = db_decode.find_frame(
+                self._get_collection(dtype, dformat, dfreq), 
                 {
                     **series_filter,
                     **{"metadata.{}".format(k) : v for k,v in series_metadata.items()}
-                }
-            ))
+                },
+                fields=fields, 
+                index_datetime=index_datetime
+            )
             if period_start < record_start or record_end < period_end:
-                exists, series_df = False, pd.DataFrame(records)
+                exists = False
                 db_logs.DBLogs().info("successful len 1 missing read_timeseries {}".format(metalogs))
                 return exists, series_df
             
-            exists, series_df = True, pd.DataFrame(records)
+            exists = True
             db_logs.DBLogs().info("successful len 1 full read_timeseries {}".format(metalogs))
             return exists, series_df
         if len(docs) > 1:
             db_logs.DBLogs().critical("read_timeseries got count gt 1 {}".format(metalogs))
             exit()
 
-    async def asyn_read_timeseries(self, dtype="equity", dformat="spot", dfreq="1d", period_start=None, period_end=None, series_metadata={}, series_identifier={}, metalogs=""):
-        self._ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="timeseries")
+    async def asyn_read_timeseries(self, dtype="equity", dformat="spot", dfreq="1d", period_start=None, period_end=None, series_metadata={}, series_identifier={}, metalogs="", 
+                                fields=db_decode.OHLCV_FIELDS, index_datetime=False):
+        await self._asyn_ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="timeseries")
         period_start = max(period_start, datetime.datetime(1970, 2, 1))
         period_end = max(period_end, datetime.datetime(1970, 2, 1))
         docs = []
@@ -314,19 +398,21 @@ class DbService():
                 period_start = period_start.replace(hour=0, minute=0, second=0, microsecond=0)
                 period_end = period_end.replace(hour=0, minute=0, second=0, microsecond=0)
             series_filter = {"datetime" : {"$gte" : period_start , "$lte" : period_end }}
-            records = []
-            async for i in (await self._asyn_get_collection(dtype, dformat, dfreq)).find(
+            series_df = await db_decode.asyn_find_frame(
+                await self._asyn_get_collection(dtype, dformat, dfreq), 
                 {
                     **series_filter,
                     **{"metadata.{}".format(k) : v for k,v in series_metadata.items()}
-                }):
-                records.append(i)
+                },
+                fields=fields, 
+                index_datetime=index_datetime
+            )
             if period_start < record_start or record_end < period_end:
-                exists, series_df = False, pd.DataFrame(records)
+                exists = False
                 db_logs.DBLogs().info("successful len 1 missing asyn_read_timeseries {}".format(metalogs))
                 return exists, series_df
             
-            exists, series_df = True, pd.DataFrame(records)
+            exists = True
             db_logs.DBLogs().info("successful len 1 full asyn_read_timeseries {}".format(metalogs))
             return exists, series_df
         if len(docs) > 1:
@@ -336,9 +422,10 @@ class DbService():
     async def asyn_batch_read_timeseries(self, 
         dtype="equity", dformat="spot", dfreq="1d", 
         period_start=None, period_end=None, 
-        series_metadatas=[], series_identifiers=[], metalogs=[]):
+        series_metadatas=[], series_identifiers=[], metalogs=[], 
+        batch_size=200, concurrency=4, fields=db_decode.OHLCV_FIELDS, index_datetime=False, return_ranges=False):
         
-        self._ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="timeseries")
+        await self._asyn_ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="timeseries")
         period_start = max(period_start, datetime.datetime(1970, 2, 1))
         period_end = max(period_end, datetime.datetime(1970, 2, 1))
         docs = []
@@ -346,13 +433,7 @@ class DbService():
             async for i in (await self._asyn_get_collection_meta(dtype, dformat, dfreq)).find({"$or" : series_identifiers}):
                 docs.append(i)
 
-        series_records = []
-        for series_identifier in series_identifiers:
-            matched = []
-            for doc in docs:
-                if series_identifier.items() <= doc.items():
-                    matched.append(doc)
-            series_records.append(matched)
+        series_records = DbService._match_identifiers(series_identifiers, docs)
 
         if dfreq == "1d":
             period_start = period_start.replace(hour=0, minute=0, second=0, microsecond=0)
@@ -362,42 +443,52 @@ class DbService():
 
         existss = [None for _ in range(len(series_identifiers))]
         series_dfs = [None for _ in range(len(series_identifiers))]
-        def poll_record(i):
+        series_ranges = [
+            (matched[0]["time_start"], matched[0]["time_end"]) if len(matched) == 1 else (None, None) 
+            for matched in series_records
+        ]
+        poll_ids = []
+        for i in range(len(series_identifiers)):
             matched = series_records[i]
             if len(matched) == 0:
                 existss[i] = False
                 series_dfs[i] = pd.DataFrame()
-
             if len(matched) == 1:
-                record_start = matched[0]["time_start"]
-                record_end = matched[0]["time_end"]
-                records = list(self._get_collection(dtype, dformat, dfreq).find(
-                    {
-                        **series_filter,
-                        **{"metadata.{}".format(k) : v for k,v in series_metadatas[i].items()}
-                    }
-                ))
-                if period_start < record_start or record_end < period_end:
-                    existss[i] = False 
-                    series_dfs[i] = pd.DataFrame(records)
-                else:
-                    existss[i] = True
-                    series_dfs[i] = pd.DataFrame(records) 
+                poll_ids.append(i)
             if len(matched) > 1:
                 db_logs.DBLogs().critical("asyn_batch_read_timeseries got count gt 1 {}".format(metalogs[i]))
                 existss[i] = None
                 series_dfs[i] = None
 
-        threads = []
-        for i in range(len(series_identifiers)):
-            threads.append(
-                threading.Thread(target=poll_record, args=(i,))
-            )
-        for thread in threads:
-            thread.start()
-        for thread in threads:
-            thread.join()
+        collection = await self._asyn_get_collection(dtype, dformat, dfreq)
+        semaphore = asyncio.Semaphore(concurrency)
+        async def poll_batch(batch_ids):
+            tickers = list({series_metadatas[i]["ticker"] for i in batch_ids})
+            pipeline = [
+                {"$match": {**series_filter, **{"metadata.ticker": {"$in": tickers}}}},
+                {"$project": {**db_decode.get_projection(fields), **{"metadata": 1}}}
+            ]
+            ticker_records = defaultdict(list)
+            async with semaphore:
+                async for record in collection.aggregate(pipeline):
+                    ticker_records[record["metadata"].get("ticker")].append(record)
+            for i in batch_ids:
+                series_metadata = series_metadatas[i]
+                records = [
+                    record for record in ticker_records[series_metadata["ticker"]] 
+                    if series_metadata.items() <= record["metadata"].items()
+                ]
+                record_start = series_records[i][0]["time_start"]
+                record_end = series_records[i][0]["time_end"]
+                existss[i] = not (period_start < record_start or record_end < period_end)
+                series_dfs[i] = db_decode.decode_docs(records, fields, index_datetime=index_datetime)
+
+        await asyncio.gather(*[
+            poll_batch(poll_ids[j : j + batch_size]) for j in range(0, len(poll_ids), batch_size)
+        ])
      
+        if return_ranges:
+            return existss, series_dfs, series_ranges
         return existss, series_dfs
    
     def insert_docs(self, dtype="equity", dformat="fundamentals", dfreq="irregular", 
@@ -421,7 +512,7 @@ class DbService():
 
     async def asyn_insert_docs(self, dtype="equity", dformat="fundamentals", dfreq="irregular", 
                             docdata={}, doc_identifier={}, metalogs=""):
-        self._ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="regular")
+        await self._asyn_ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="regular")
         doc_count = await (await self._asyn_get_collection(dtype, dformat, dfreq)).count_documents(doc_identifier)
         if doc_count == 0:
             doc = {**doc_identifier, **{"data" : docdata}, **{"last_updated": datetime.datetime.utcnow()}}
@@ -440,20 +531,14 @@ class DbService():
 
     async def asyn_batch_insert_docs(self, dtype="equity", dformat="fundamentals", dfreq="irregular", 
                             docdatas=[], doc_identifiers=[], metalogs=[]):
-        self._ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="regular")
+        await self._asyn_ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="regular")
         
         docs = []
         if doc_identifiers:
             async for i in (await self._asyn_get_collection(dtype, dformat, dfreq)).find({"$or" : doc_identifiers}):
                 docs.append(i)
             
-        doc_records = []
-        for doc_identifier in doc_identifiers:
-            matched = []
-            for doc in docs:
-                if doc_identifier.items() <= doc.items():
-                    matched.append(doc)
-            doc_records.append(matched)
+        doc_records = DbService._match_identifiers(doc_identifiers, docs)
         
         new_inserts = []
         new_updates = []
@@ -507,7 +592,7 @@ class DbService():
 
     async def asyn_read_docs(self, dtype="equity", dformat="fundamentals", dfreq="irregular", 
                             doc_identifier={}, metalogs="", expire_db=10):
-        self._ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="regular")
+        await self._asyn_ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="regular")
         docs = []
         async for i in (await self._asyn_get_collection(dtype, dformat, dfreq)).find(doc_identifier):
             docs.append(i)
@@ -530,19 +615,13 @@ class DbService():
 
     async def asyn_batch_read_docs(self, dtype="equity", dformat="fundamentals", dfreq="irregular", 
                             doc_identifiers=[], metalogs=[], expire_db=24*5):
-        self._ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="regular")
+        await self._asyn_ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="regular")
         docs = []
         if doc_identifiers:
             async for i in (await self._asyn_get_collection(dtype, dformat, dfreq)).find({"$or": doc_identifiers}):
                 docs.append(i)
 
-        doc_records = []
-        for doc_identifier in doc_identifiers:
-            matched = []
-            for doc in docs:
-                if doc_identifier.items() <= doc.items():
-                    matched.append(doc)
-            doc_records.append(matched)         
+        doc_records = DbService._match_identifiers(doc_identifiers, docs)
              
         existss = []
         expireds = []
@@ -575,3 +654,20 @@ class DbService():
                 docdatas.append(None)
         
         return existss, expireds, docdatas
+
+    def find_docs(self, dtype="equity", dformat="fundamentals", dfreq="irregular", doc_filter={}, metalogs=""):
+        """
+        every doc matching doc_filter, for collections loaded whole (identifier index)
+        """
+        self._ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="regular")
+        docs = list(self._get_collection(dtype, dformat, dfreq).find(doc_filter, {"_id": 0}))
+        db_logs.DBLogs().info("successful len {} find_docs {}".format(len(docs), metalogs))
+        return docs
+
+    async def asyn_find_docs(self, dtype="equity", dformat="fundamentals", dfreq="irregular", doc_filter={}, metalogs=""):
+        await self._asyn_ensure_coll(dtype=dtype, dformat=dformat, dfreq=dfreq, coll_type="regular")
+        docs = []
+        async for i in (await self._asyn_get_collection(dtype, dformat, dfreq)).find(doc_filter, {"_id": 0}):
+            docs.append(i)
+        db_logs.DBLogs().info("successful len {} asyn_find_docs {}".format(len(docs), metalogs))
+        return docs
@@ -0,0 +1,105 @@
+import copy
+import time
+import threading
+
+from collections import OrderedDict
+
+import db_logs
+
+class FundamentalsCache():
+    """
+    full fundamentals payloads keyed by (ticker, exchange), held in memory with a ttl and lru eviction
+    so that every section getter is served from one fetch
+    optional mongo tier through db_service.read_docs/insert_docs, expire_db in hours as in the rest of DbService
+    get / get_section return copies, callers can modify them without touching the cached payload
+    """
+    def __init__(self, fetcher, db_service=None, ttl_hours=10, max_entries=512, read_db=False, insert_db=False, expire_db=10):
+        self.fetcher = fetcher
+        self.db_service = db_service
+        self.ttl = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.read_db = read_db
+        self.insert_db = insert_db
+        self.expire_db = expire_db
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _doc_identifier(ticker, exchange):
+        return {
+            "type": "ticker_fundamentals",
+            "ticker": ticker,
+            "exchange": exchange,
+            "source": "eodhistoricaldata"
+        }
+
+    def _get_memory(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            fetched_at, docdata = entry
+            if time.monotonic() - fetched_at >= self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return docdata
+
+    def put(self, ticker, exchange, docdata):
+        with self._lock:
+            self._entries[(ticker, exchange)] = (time.monotonic(), docdata)
+            self._entries.move_to_end((ticker, exchange))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, ticker=None, exchange=None):
+        with self._lock:
+            if ticker is None:
+                self._entries.clear()
+                return
+            self._entries.pop((ticker, exchange), None)
+
+    def __contains__(self, key):
+        return self._get_memory(key) is not None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _get(self, ticker, exchange, read_db=None, insert_db=None, expire_db=None):
+        read_db = self.read_db if read_db is None else read_db
+        insert_db = self.insert_db if insert_db is None else insert_db
+        expire_db = self.expire_db if expire_db is None else expire_db
+
+        docdata = self._get_memory((ticker, exchange))
+        if docdata is not None:
+            return docdata
+
+        doc_identifier = FundamentalsCache._doc_identifier(ticker, exchange)
+        if read_db and expire_db > 0 and self.db_service is not None:
+            exists, expired, docdata = self.db_service.read_docs(
+                dtype="equity", dformat="fundamentals", dfreq="irregular",
+                doc_identifier=doc_identifier, metalogs=ticker, expire_db=expire_db
+            )
+            if exists and not expired:
+                self.put(ticker, exchange, docdata)
+                return docdata
+
+        docdata = self.fetcher(ticker, exchange)
+        if not isinstance(docdata, dict) or not docdata:
+            db_logs.DBLogs().critical("FundamentalsCache fetch FAILED {}.{}".format(ticker, exchange))
+            return docdata
+        self.put(ticker, exchange, docdata)
+        if insert_db and self.db_service is not None:
+            self.db_service.insert_docs(
+                dtype="equity", dformat="fundamentals", dfreq="irregular",
+                docdata=docdata, doc_identifier=doc_identifier, metalogs=ticker
+            )
+        return docdata
+
+    def get(self, ticker, exchange, read_db=None, insert_db=None, expire_db=None):
+        return copy.deepcopy(self._get(ticker=ticker, exchange=exchange, read_db=read_db, insert_db=insert_db, expire_db=expire_db))
+
+    def get_section(self, ticker, exchange, section, read_db=None, insert_db=None, expire_db=None):
+        docdata = self._get(ticker=ticker, exchange=exchange, read_db=read_db, insert_db=insert_db, expire_db=expire_db)
+        return copy.deepcopy(docdata.get(section)) if isinstance(docdata, dict) else None
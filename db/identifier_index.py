@@ -0,0 +1,176 @@
+import threading
+
+from collections import defaultdict
+
+import db_logs
+
+CODES = ("isin", "cusip", "cik")
+
+def codes_from_general(general):
+    """
+    {"isin", "cusip", "cik"} from a fundamentals General section, "" when missing as in get_identification_codes
+    """
+    fields = defaultdict(str)
+    fields.update(general if isinstance(general, dict) else {})
+    return {"isin": fields["ISIN"] or "", "cusip": fields["CUSIP"] or "", "cik": fields["CIK"] or ""}
+
+class IdentifierIndex():
+    """
+    (ticker, exchange) -> {"isin", "cusip", "cik"}, an in memory mirror of the equity_identifiers_irregular collection
+    loaded once, refreshed in bulk from exchange symbol lists and generals, a cold miss goes to the resolver
+    (generals round trip) and is written through, so price reads resolve identifiers without network i/o
+    codes without an isin are returned but not kept, the next read resolves them again
+    """
+    def __init__(self, db_service=None, resolver=None, asyn_resolver=None, asyn_batch_resolver=None, insert_chunksize=1000):
+        self.db_service = db_service
+        self.resolver = resolver
+        self.asyn_resolver = asyn_resolver
+        self.asyn_batch_resolver = asyn_batch_resolver
+        self.insert_chunksize = insert_chunksize
+        self._codes = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _doc_identifier(ticker, exchange):
+        return {
+            "type": "ticker_identifiers",
+            "ticker": ticker,
+            "exchange": exchange,
+            "source": "eodhistoricaldata"
+        }
+
+    def _load_docs(self, docs):
+        with self._lock:
+            for doc in docs:
+                data = doc.get("data") or {}
+                if data.get("isin"):
+                    self._codes.setdefault((doc["ticker"], doc["exchange"]), {code: data.get(code, "") for code in CODES})
+            self._loaded = True
+
+    def load(self):
+        if self._loaded:
+            return
+        docs = []
+        if self.db_service is not None:
+            try:
+                docs = self.db_service.find_docs(dtype="equity", dformat="identifiers", dfreq="irregular", doc_filter={"type": "ticker_identifiers"}, metalogs="identifier index")
+            except Exception:
+                db_logs.DBLogs().warning("IdentifierIndex load FAILED, serving from memory only")
+        self._load_docs(docs)
+
+    async def asyn_load(self):
+        if self._loaded:
+            return
+        docs = []
+        if self.db_service is not None:
+            try:
+                docs = await self.db_service.asyn_find_docs(dtype="equity", dformat="identifiers", dfreq="irregular", doc_filter={"type": "ticker_identifiers"}, metalogs="identifier index")
+            except Exception:
+                db_logs.DBLogs().warning("IdentifierIndex asyn_load FAILED, serving from memory only")
+        self._load_docs(docs)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._codes
+
+    def __len__(self):
+        with self._lock:
+            return len(self._codes)
+
+    def lookup(self, ticker, exchange):
+        """
+        memory only, None when not indexed
+        """
+        with self._lock:
+            codes = self._codes.get((ticker, exchange))
+            return dict(codes) if codes is not None else None
+
+    def update(self, tickers, exchanges, codess):
+        """
+        merges codes into memory, empty codes never overwrite known ones, returns the changed keys
+        """
+        changed = []
+        with self._lock:
+            for ticker, exchange, codes in zip(tickers, exchanges, codess):
+                if not codes:
+                    continue
+                current = self._codes.get((ticker, exchange), {code: "" for code in CODES})
+                merged = {code: codes.get(code) or current[code] for code in CODES}
+                if merged["isin"] and merged != current:
+                    self._codes[(ticker, exchange)] = merged
+                    changed.append((ticker, exchange))
+        return changed
+
+    def write(self, keys):
+        if self.db_service is None or not keys:
+            return
+        for ticker, exchange in keys:
+            try:
+                self.db_service.insert_docs(dtype="equity", dformat="identifiers", dfreq="irregular",
+                    docdata=self.lookup(ticker, exchange), doc_identifier=IdentifierIndex._doc_identifier(ticker, exchange), metalogs=ticker)
+            except Exception:
+                db_logs.DBLogs().warning("IdentifierIndex insert FAILED {}".format(ticker))
+
+    async def asyn_write(self, keys):
+        if self.db_service is None or not keys:
+            return
+        for i in range(0, len(keys), self.insert_chunksize):
+            chunk = keys[i:i + self.insert_chunksize]
+            try:
+                await self.db_service.asyn_batch_insert_docs(dtype="equity", dformat="identifiers", dfreq="irregular",
+                    docdatas=[self.lookup(ticker, exchange) for ticker, exchange in chunk],
+                    doc_identifiers=[IdentifierIndex._doc_identifier(ticker, exchange) for ticker, exchange in chunk],
+                    metalogs=[ticker for ticker, _ in chunk])
+            except Exception:
+                db_logs.DBLogs().warning("IdentifierIndex asyn_batch_insert FAILED {} docs".format(len(chunk)))
+
+    def get(self, ticker, exchange):
+        self.load()
+        codes = self.lookup(ticker, exchange)
+        if codes is not None:
+            return codes
+        codes = self.resolver(ticker, exchange)
+        self.write(self.update([ticker], [exchange], [codes]))
+        return codes
+
+    async def asyn_get(self, ticker, exchange):
+        await self.asyn_load()
+        codes = self.lookup(ticker, exchange)
+        if codes is not None:
+            return codes
+        codes = await self.asyn_resolver(ticker, exchange)
+        await self.asyn_write(self.update([ticker], [exchange], [codes]))
+        return codes
+
+    async def asyn_batch_get(self, tickers, exchanges):
+        await self.asyn_load()
+        batch_codes = [self.lookup(ticker, exchange) for ticker, exchange in zip(tickers, exchanges)]
+        missing = [i for i, codes in enumerate(batch_codes) if codes is None]
+        if missing:
+            missing_tickers = [tickers[i] for i in missing]
+            missing_exchanges = [exchanges[i] for i in missing]
+            resolved = await self.asyn_batch_resolver(missing_tickers, missing_exchanges)
+            for i, codes in zip(missing, resolved):
+                batch_codes[i] = codes
+            await self.asyn_write(self.update(missing_tickers, missing_exchanges, resolved))
+            db_logs.DBLogs().info("IdentifierIndex resolved {} cold misses".format(len(missing)))
+        return batch_codes
+
+    def refresh_from_symbols(self, symbols, exchange):
+        """
+        exchange symbol list records (Code, Isin...), only isin is known from them
+        """
+        symbols = [symbol for symbol in symbols if symbol.get("Code") and symbol.get("Isin")]
+        return self.update(
+            [symbol["Code"] for symbol in symbols],
+            [exchange for _ in symbols],
+            [{"isin": symbol["Isin"]} for symbol in symbols]
+        )
+
+    def refresh_from_generals(self, generals, exchange):
+        """
+        {ticker: General section}, as in asyn_batch_get_bulk_fundamentals entries
+        """
+        tickers = list(generals.keys())
+        return self.update(tickers, [exchange for _ in tickers], [codes_from_general(generals[ticker]) for ticker in tickers])
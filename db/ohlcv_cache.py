@@ -0,0 +1,248 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import datetime
+import threading
+import pandas as pd
+
+from collections import OrderedDict
+
+import db_logs
+import db.db_decode as db_decode
+
+class OhlcvCache():
+    """
+    local read through tier in front of DbService.read_timeseries, one parquet file per series identifier
+    index.json keeps each series' covered [time_start, time_end], the -meta last_updated it was read under and the lru order
+    a read only goes to mongo for the requested span outside the local coverage (clipped to the -meta coverage),
+    the -meta doc is re-checked every revalidate_seconds and a changed last_updated drops the local copy
+    files are evicted least recently used first once the directory exceeds max_bytes
+    a relative directory is resolved against root (the config file's directory when built by Equities)
+    """
+    def __init__(self, db_service, directory, root=None, max_bytes=2 * 1024**3, revalidate_seconds=3600,
+                 dtype="equity", dformat="spot", dfreq="1d"):
+        directory = os.path.expanduser(directory)
+        if root is not None:
+            directory = os.path.join(os.path.expanduser(root), directory)
+        if not os.path.isabs(directory):
+            raise ValueError("OhlcvCache directory {} is relative and no root was given".format(directory))
+        self.db_service = db_service
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self.dtype = dtype
+        self.dformat = dformat
+        self.dfreq = dfreq
+        self._entries = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(series_identifier):
+        return hashlib.sha1(json.dumps(series_identifier, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".parquet")
+
+    def _index_path(self):
+        return os.path.join(self.directory, "index.json")
+
+    def _load_index(self):
+        if self._entries is not None:
+            return self._entries
+        self._entries = OrderedDict()
+        if os.path.exists(self._index_path()):
+            try:
+                with open(self._index_path(), "r") as f:
+                    for key, entry in json.load(f):
+                        self._entries[key] = entry
+            except (ValueError, TypeError):
+                db_logs.DBLogs().warning("OhlcvCache unreadable index, starting empty {}".format(self.directory))
+        return self._entries
+
+    def _save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._index_path() + ".tmp", "w") as f:
+            json.dump(list(self._entries.items()), f)
+        os.replace(self._index_path() + ".tmp", self._index_path())
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        if os.path.exists(self._path(key)):
+            os.remove(self._path(key))
+
+    def _evict(self):
+        total = sum(entry["bytes"] for entry in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            key, entry = next(iter(self._entries.items()))
+            total -= entry["bytes"]
+            self._drop(key)
+
+    def invalidate(self, series_identifier=None):
+        self.invalidate_many(None if series_identifier is None else [series_identifier])
+
+    def invalidate_many(self, series_identifiers=None):
+        """
+        drops the given series (all of them with None), called after inserts so that the next read revalidates
+        """
+        with self._lock:
+            entries = self._load_index()
+            keys = list(entries.keys()) if series_identifiers is None else [OhlcvCache._key(series_identifier) for series_identifier in series_identifiers]
+            for key in keys:
+                self._drop(key)
+            self._save_index()
+
+    async def asyn_invalidate(self, series_identifiers=None):
+        await asyncio.to_thread(self.invalidate_many, series_identifiers)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load_index())
+
+    def _normalize(self, period_start, period_end):
+        period_start = max(period_start, datetime.datetime(1970, 2, 1))
+        period_end = max(period_end, datetime.datetime(1970, 2, 1))
+        if self.dfreq == "1d":
+            period_start = period_start.replace(hour=0, minute=0, second=0, microsecond=0)
+            period_end = period_end.replace(hour=0, minute=0, second=0, microsecond=0)
+        return pd.Timestamp(period_start), pd.Timestamp(period_end)
+
+    def _needs_meta(self, key):
+        with self._lock:
+            entry = self._load_index().get(key)
+            return entry is None or time.time() - entry["checked_at"] >= self.revalidate_seconds
+
+    def _plan(self, key, checked, meta, period_start, period_end):
+        """
+        revalidates the entry against the -meta doc when it was just read, returns the spans to read from mongo
+        """
+        with self._lock:
+            entries = self._load_index()
+            entry = entries.get(key)
+            if checked and meta is None:
+                if entry is not None:
+                    self._drop(key)
+                    self._save_index()
+                return None, []
+            if checked:
+                last_updated = str(meta["last_updated"])
+                if entry is not None and entry["last_updated"] != last_updated:
+                    db_logs.DBLogs().info("OhlcvCache stale series dropped {}".format(key))
+                    self._drop(key)
+                    entry = None
+                if entry is None:
+                    entry = {"time_start": None, "time_end": None, "bytes": 0}
+                    entries[key] = entry
+                entry.update({
+                    "last_updated": last_updated,
+                    "checked_at": time.time(),
+                    "meta_start": str(meta["time_start"]),
+                    "meta_end": str(meta["time_end"]),
+                })
+            if entry is None:
+                return None, []
+
+            want_start = max(period_start, pd.Timestamp(entry["meta_start"]))
+            want_end = min(period_end, pd.Timestamp(entry["meta_end"]))
+            if want_start > want_end:
+                return entry, []
+            if entry["time_start"] is None:
+                return entry, [(want_start, want_end)]
+            covered_start, covered_end = pd.Timestamp(entry["time_start"]), pd.Timestamp(entry["time_end"])
+            gaps = []
+            if want_start < covered_start:
+                gaps.append((want_start, covered_start))
+            if want_end > covered_end:
+                gaps.append((covered_end, want_end))
+            return entry, gaps
+
+    def _merge(self, key, entry, gaps, frames):
+        """
+        writes the gap reads into the local file, the coverage grows from its edges so it stays one span
+        """
+        with self._lock:
+            entries = self._load_index()
+            path = self._path(key)
+            if gaps:
+                local = [pd.read_parquet(path)] if entry["time_start"] is not None and os.path.exists(path) else []
+                frames = [frame for frame in frames if frame is not None and len(frame) > 0]
+                series_df = pd.concat(local + frames, ignore_index=True) if local + frames else db_decode.columns_to_frame([], {field: [] for field in db_decode.OHLCV_FIELDS}, db_decode.OHLCV_FIELDS, index_datetime=False)
+                series_df = series_df.drop_duplicates("datetime", keep="last").sort_values("datetime").reset_index(drop=True)
+                os.makedirs(self.directory, exist_ok=True)
+                series_df.to_parquet(path + ".tmp", index=False)
+                os.replace(path + ".tmp", path)
+                starts = [start for start, _ in gaps] + ([pd.Timestamp(entry["time_start"])] if entry["time_start"] is not None else [])
+                ends = [end for _, end in gaps] + ([pd.Timestamp(entry["time_end"])] if entry["time_end"] is not None else [])
+                entry["time_start"], entry["time_end"] = str(min(starts)), str(max(ends))
+                entry["bytes"] = os.path.getsize(path)
+            else:
+                series_df = pd.read_parquet(path) if entry["time_start"] is not None and os.path.exists(path) else None
+            entries[key] = entry
+            entries.move_to_end(key)
+            self._evict()
+            self._save_index()
+            return series_df
+
+    @staticmethod
+    def _result(entry, series_df, period_start, period_end, fields, index_datetime):
+        if entry is None:
+            return False, pd.DataFrame()
+        exists = pd.Timestamp(entry["meta_start"]) <= period_start and period_end <= pd.Timestamp(entry["meta_end"])
+        if series_df is None or len(series_df) == 0:
+            series_df = db_decode.columns_to_frame([], {field: [] for field in fields}, fields, index_datetime=False)
+        series_df = series_df.loc[(series_df["datetime"] >= period_start) & (series_df["datetime"] <= period_end), ["datetime"] + list(fields)]
+        series_df = series_df.reset_index(drop=True)
+        return exists, series_df.set_index("datetime") if index_datetime else series_df
+
+    def read_timeseries(self, period_start=None, period_end=None, series_metadata={}, series_identifier={}, metalogs="",
+                        fields=db_decode.OHLCV_FIELDS, index_datetime=False):
+        """
+        same (exists, series_df) contract as DbService.read_timeseries
+        """
+        key = OhlcvCache._key(series_identifier)
+        period_start, period_end = self._normalize(period_start, period_end)
+        meta = None
+        checked = self._needs_meta(key)
+        if checked:
+            meta = self.db_service.read_timeseries_meta(dtype=self.dtype, dformat=self.dformat, dfreq=self.dfreq, series_identifier=series_identifier)
+        entry, gaps = self._plan(key, checked, meta, period_start, period_end)
+        if entry is None:
+            db_logs.DBLogs().info("successful len 0 OhlcvCache read_timeseries {}".format(metalogs))
+            return False, pd.DataFrame()
+        frames = []
+        for gap_start, gap_end in gaps:
+            _, gap_df = self.db_service.read_timeseries(
+                dtype=self.dtype, dformat=self.dformat, dfreq=self.dfreq,
+                period_start=gap_start.to_pydatetime(), period_end=gap_end.to_pydatetime(),
+                series_metadata=series_metadata, series_identifier=series_identifier, metalogs=metalogs
+            )
+            frames.append(gap_df)
+        series_df = self._merge(key, entry, gaps, frames)
+        db_logs.DBLogs().info("successful OhlcvCache read_timeseries with {} mongo reads {}".format(len(gaps), metalogs))
+        return OhlcvCache._result(entry, series_df, period_start, period_end, fields, index_datetime)
+
+    async def asyn_read_timeseries(self, period_start=None, period_end=None, series_metadata={}, series_identifier={}, metalogs="",
+                                   fields=db_decode.OHLCV_FIELDS, index_datetime=False):
+        # the index and parquet file i/o runs in a worker thread, only the mongo reads are awaited on the loop
+        key = OhlcvCache._key(series_identifier)
+        period_start, period_end = self._normalize(period_start, period_end)
+        meta = None
+        checked = await asyncio.to_thread(self._needs_meta, key)
+        if checked:
+            meta = await self.db_service.asyn_read_timeseries_meta(dtype=self.dtype, dformat=self.dformat, dfreq=self.dfreq, series_identifier=series_identifier)
+        entry, gaps = await asyncio.to_thread(self._plan, key, checked, meta, period_start, period_end)
+        if entry is None:
+            db_logs.DBLogs().info("successful len 0 OhlcvCache asyn_read_timeseries {}".format(metalogs))
+            return False, pd.DataFrame()
+        frames = []
+        for gap_start, gap_end in gaps:
+            _, gap_df = await self.db_service.asyn_read_timeseries(
+                dtype=self.dtype, dformat=self.dformat, dfreq=self.dfreq,
+                period_start=gap_start.to_pydatetime(), period_end=gap_end.to_pydatetime(),
+                series_metadata=series_metadata, series_identifier=series_identifier, metalogs=metalogs
+            )
+            frames.append(gap_df)
+        series_df = await asyncio.to_thread(self._merge, key, entry, gaps, frames)
+        db_logs.DBLogs().info("successful OhlcvCache asyn_read_timeseries with {} mongo reads {}".format(len(gaps), metalogs))
+        return OhlcvCache._result(entry, series_df, period_start, period_end, fields, index_datetime)
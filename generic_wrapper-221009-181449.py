@@ -4,133 +4,175 @@ import pandas as pd
 from data_service.utils.datetime_utils import get_span
 from collections import defaultdict
 
+_DONE = object()
+
+async def _run_stage(fn, in_queue, out_queue, workers, out_workers):
+    async def work():
+        while True:
+            item = await in_queue.get()
+            if item is _DONE:
+                return
+            result = await fn(item)
+            if out_queue is not None:
+                await out_queue.put(result)
+    await asyncio.gather(*[work() for _ in range(workers)])
+    if out_queue is not None:
+        for _ in range(out_workers):
+            await out_queue.put(_DONE)
+
 async def asyn_batch_get_timeseries(
-    tickers, exchanges, read_db, insert_db, granularity, 
-    db_service, datapoller, engine, dtype, dformat, 
-    period_start=None, period_end=None, duration=None, 
-    chunksize=100, results=[], tasks=[], batch_id=0
+    tickers, exchanges, read_db, insert_db, granularity,
+    db_service, datapoller, engine, dtype, dformat,
+    period_start=None, period_end=None, duration=None,
+    chunksize=100, queue_size=2, read_workers=1, fetch_workers=2, merge_workers=1, insert_workers=1
 ):
-    print(f"START BATCH {batch_id}")
+    """
+    chunks of `chunksize` tickers flow through read -> fetch -> merge -> insert stages that run concurrently,
+    each stage has its own number of workers and is fed through a queue bounded by `queue_size` chunks
+    results are returned in ticker order
+    """
     assert(engine in ["eodhistoricaldata", "DWX-MT5"])
-    if not tickers:
-        print("gathering results")
-        await asyncio.gather(*tasks)
-        return results
-    
-    temp_tickers = list(tickers)
-    temp_exchanges = list(exchanges)
-    tickers = tickers[:chunksize]
-    exchanges = exchanges[:chunksize]
-    
-    series_metadatas = None
-    
-    if engine == "eodhistoricaldata":
-        series_metadatas = [{"ticker": tickers[i], "source": f"eodhistoricaldata-{exchanges[i]}"} for i in range(len(tickers))]
-    if engine == "DWX-MT5":
-        series_metadatas = [{"ticker": tickers[i], "source": engine} for i in range(len(tickers))]
-
-    assert(series_metadatas)
-    series_identifiers = [{**{"type" : "ticker_series"}, **series_metadata} for series_metadata in series_metadatas]
     period_start, period_end = get_span(
-        period_start=period_start, 
-        period_end=period_end, 
-        duration=duration, 
+        period_start=period_start,
+        period_end=period_end,
+        duration=duration,
         granularity=granularity
     )
-    result_dfs = []
-    if read_db:
-        result_ranges, result_dfs = await db_service.asyn_batch_read_timeseries(
-            dtype=dtype, 
-            dformat=dformat, 
-            dfreq=granularity, 
-            period_start=period_start,
-            period_end=period_end,
-            series_metadatas=series_metadatas, 
-            series_identifiers=series_identifiers, 
-            metalogs=batch_id 
-        )
-    if not period_start or not period_end:
-        return result_dfs if result_dfs else [pd.DataFrame() for _ in range(len(tickers))]
+    tickers, exchanges = list(tickers), list(exchanges)
+    n_chunks = (len(tickers) + chunksize - 1) // chunksize
+    results = [None for _ in range(n_chunks)]
 
-    requests = defaultdict(list)
-    
-    for i in range(len(tickers)):
-        result_start, result_end = result_ranges[i]
-        if not result_start and not result_end:
-            requests[tickers[i]].append({"period_start" : period_start, "period_end" : period_end, "exchange": exchanges[i]})
-            continue
-        assert(result_start and result_end)
-        
-        if period_start < result_start:
-            requests[tickers[i]].append({"period_start" : period_start, "period_end" : result_start, "exchange": exchanges[i]})
-        if period_end > result_end:
-            requests[tickers[i]].append({"period_start" : result_end, "period_end": period_end, "exchange": exchanges[i]})
+    async def read(chunk):
+        print(f"START BATCH {chunk['batch_id']}")
+        chunk_tickers, chunk_exchanges = chunk["tickers"], chunk["exchanges"]
+        if engine == "eodhistoricaldata":
+            series_metadatas = [{"ticker": chunk_tickers[i], "source": f"eodhistoricaldata-{chunk_exchanges[i]}"} for i in range(len(chunk_tickers))]
+        if engine == "DWX-MT5":
+            series_metadatas = [{"ticker": chunk_tickers[i], "source": engine} for i in range(len(chunk_tickers))]
+        series_identifiers = [{**{"type" : "ticker_series"}, **series_metadata} for series_metadata in series_metadatas]
+        result_ranges = [(None, None) for _ in range(len(chunk_tickers))]
+        result_dfs = [pd.DataFrame() for _ in range(len(chunk_tickers))]
+        if read_db:
+            _, result_dfs, result_ranges = await db_service.asyn_batch_read_timeseries(
+                dtype=dtype,
+                dformat=dformat,
+                dfreq=granularity,
+                period_start=period_start,
+                period_end=period_end,
+                series_metadatas=series_metadatas,
+                series_identifiers=series_identifiers,
+                metalogs=chunk_tickers,
+                return_ranges=True
+            )
+        return {**chunk, **{
+            "series_metadatas": series_metadatas,
+            "series_identifiers": series_identifiers,
+            "result_ranges": result_ranges,
+            "result_dfs": [df if df is not None else pd.DataFrame() for df in result_dfs]
+        }}
 
-    request_tickers = []
-    request_exchanges = []
-    request_starts, request_ends = [], []
-    request_metadatas, request_identifiers = [], []
-    for i in range(len(tickers)):
-        ticker = tickers[i]
-        v = requests[ticker]
-        request_tickers.extend([ticker] * len(v))
-        request_exchanges.extend([spec["exchange"] for spec in v])
-        request_starts.extend([spec["period_start"] for spec in v])
-        request_ends.extend([spec["period_end"] for spec in v])
-        request_metadatas.extend([series_metadatas[i]] * len(v))
-        request_identifiers.extend([series_identifiers[i]] * len(v))
+    async def fetch(chunk):
+        if not period_start or not period_end:
+            return {**chunk, **{"request_results": []}}
+        chunk_tickers, chunk_exchanges = chunk["tickers"], chunk["exchanges"]
+        requests = defaultdict(list)
+        for i in range(len(chunk_tickers)):
+            result_start, result_end = chunk["result_ranges"][i]
+            if not result_start and not result_end:
+                requests[i].append({"period_start" : period_start, "period_end" : period_end})
+                continue
+            assert(result_start and result_end)
+            if period_start < result_start:
+                requests[i].append({"period_start" : period_start, "period_end" : result_start})
+            if period_end > result_end:
+                requests[i].append({"period_start" : result_end, "period_end": period_end})
 
-    request_results = await datapoller.asyn_batch_get_ohlcv(
-        tickers=request_tickers, 
-        exchanges=request_exchanges, 
-        period_starts=request_starts,
-        period_ends=request_ends,
-        granularity=granularity
-    )
-    j = 0
-    ohlcvs = []
-    for i in range(len(tickers)):
-        result_start, result_end = result_ranges[i]
-        db_df = result_dfs[i]
-        if not result_start and not result_end:
-            ohlcvs.append(request_results[j])
-            j += 1
-            continue
-        head_df, tail_df = pd.DataFrame(), pd.DataFrame()
-        if period_start < result_start:
-            head_df = request_results[j]
-            j += 1
-        if period_end > result_end:
-            tail_df = request_results[j]
-            j += 1
-        concat_dfs = [head_df, db_df, tail_df]   
-        df = pd.concat(concat_dfs, axis=0).drop_duplicates("datetime").reset_index(drop=True)
-        ohlcvs.append(df)
-    assert(j == len(request_results))       
+        request_tickers, request_exchanges, request_starts, request_ends = [], [], [], []
+        for i in range(len(chunk_tickers)):
+            for spec in requests[i]:
+                request_tickers.append(chunk_tickers[i])
+                request_exchanges.append(chunk_exchanges[i])
+                request_starts.append(spec["period_start"])
+                request_ends.append(spec["period_end"])
 
-    if insert_db:
-        insert_tickers = [tickers[i] for i in range(len(tickers)) if not ohlcvs[i].empty]
-        insert_ohlcvs = [ohlcvs[i] for i in range(len(tickers)) if not ohlcvs[i].empty]
-        insert_series_metadatas = [series_metadatas[i] for i in range(len(tickers)) if not ohlcvs[i].empty]
-        insert_series_identifiers = [series_identifiers[i] for i in range(len(tickers)) if not ohlcvs[i].empty]
-        
-        task = asyncio.create_task(
-                db_service.asyn_batch_insert_timeseries_df(
-                dtype=dtype, 
-                dformat=dformat, 
-                dfreq=granularity, 
-                dfs=insert_ohlcvs, 
-                series_identifiers=insert_series_identifiers, 
-                series_metadatas=insert_series_metadatas, 
-                metalogs=batch_id
-            )
+        request_results = await datapoller.asyn_batch_get_ohlcv(
+            tickers=request_tickers,
+            exchanges=request_exchanges,
+            period_starts=request_starts,
+            period_ends=request_ends,
+            granularity=granularity
         )
-        tasks.append(task)
-        await asyncio.sleep(0)
-    results.extend(ohlcvs)
-     
-    return await asyn_batch_get_timeseries(   
-        temp_tickers[chunksize:], temp_exchanges[chunksize:], read_db, insert_db, 
-        granularity, db_service, datapoller, engine, dtype, dformat, period_start, period_end, 
-        duration, chunksize, results, tasks, batch_id+1
-    )
\ No newline at end of file
+        return {**chunk, **{"request_results": request_results}}
+
+    async def merge(chunk):
+        if not period_start or not period_end:
+            results[chunk["batch_id"]] = chunk["result_dfs"]
+            return {**chunk, **{"ohlcvs": []}}
+        j = 0
+        ohlcvs = []
+        request_results = chunk["request_results"]
+        for i in range(len(chunk["tickers"])):
+            result_start, result_end = chunk["result_ranges"][i]
+            db_df = chunk["result_dfs"][i]
+            if not result_start and not result_end:
+                ohlcvs.append(request_results[j])
+                j += 1
+                continue
+            head_df, tail_df = pd.DataFrame(), pd.DataFrame()
+            if period_start < result_start:
+                head_df = request_results[j]
+                j += 1
+            if period_end > result_end:
+                tail_df = request_results[j]
+                j += 1
+            concat_dfs = [head_df, db_df, tail_df]
+            df = pd.concat(concat_dfs, axis=0).drop_duplicates("datetime").reset_index(drop=True)
+            ohlcvs.append(df)
+        assert(j == len(request_results))
+        results[chunk["batch_id"]] = ohlcvs
+        return {**chunk, **{"ohlcvs": ohlcvs}}
+
+    async def insert(chunk):
+        ohlcvs = chunk["ohlcvs"]
+        insert_ids = [i for i in range(len(ohlcvs)) if not ohlcvs[i].empty]
+        if not insert_db or not insert_ids:
+            return chunk
+        await db_service.asyn_batch_insert_timeseries_df(
+            dtype=dtype,
+            dformat=dformat,
+            dfreq=granularity,
+            dfs=[ohlcvs[i] for i in insert_ids],
+            series_identifiers=[chunk["series_identifiers"][i] for i in insert_ids],
+            series_metadatas=[chunk["series_metadatas"][i] for i in insert_ids],
+            metalogs=[chunk["tickers"][i] for i in insert_ids]
+        )
+        return chunk
+
+    read_queue, fetch_queue, merge_queue, insert_queue = [asyncio.Queue(maxsize=queue_size) for _ in range(4)]
+
+    async def produce():
+        for batch_id in range(n_chunks):
+            await read_queue.put({
+                "batch_id": batch_id,
+                "tickers": tickers[batch_id * chunksize : (batch_id + 1) * chunksize],
+                "exchanges": exchanges[batch_id * chunksize : (batch_id + 1) * chunksize],
+            })
+        for _ in range(read_workers):
+            await read_queue.put(_DONE)
+
+    stages = [
+        asyncio.create_task(produce()),
+        asyncio.create_task(_run_stage(read, read_queue, fetch_queue, read_workers, fetch_workers)),
+        asyncio.create_task(_run_stage(fetch, fetch_queue, merge_queue, fetch_workers, merge_workers)),
+        asyncio.create_task(_run_stage(merge, merge_queue, insert_queue, merge_workers, insert_workers)),
+        asyncio.create_task(_run_stage(insert, insert_queue, None, insert_workers, 0)),
+    ]
+    try:
+        await asyncio.gather(*stages)
+    except BaseException:
+        for stage in stages:
+            stage.cancel()
+        raise
+
+    print("gathering results")
+    return [ohlcv for chunk_results in results for ohlcv in chunk_results]
@@ -35,7 +35,7 @@ class Baskets():
     Supported indices: https://eodhistoricaldata.com/financial-apis/list-supported-indices/
     """
     def get_index_fundamentals(self, ticker, exchange="INDX"):
-        return self.eod_client.get_fundamental_equity("{}.{}".format(ticker, exchange)) 
+        return eod_wrapper.get_fundamental_data(eod_client=self.eod_client, ticker=ticker, exchange=exchange)
 
     def get_index_generals(self, ticker, exchange="INDX"):
         return self.get_index_fundamentals(ticker=ticker, exchange=exchange)["General"]
@@ -1,6 +1,5 @@
 import os
 import json
-import requests
 import datetime
 import calendar
 import numpy as np
@@ -9,6 +8,7 @@ import pandas as pd
 from dateutil.relativedelta import relativedelta
 
 import wrappers.eod_wrapper as eod_wrapper
+import wrappers.http_client as http_client
 
 class Crypto():
         
@@ -22,7 +22,7 @@ class Crypto():
         params = {
             "api_token": os.getenv('EOD_KEY')
         }
-        resp = requests.get(url, params=params)
+        resp = http_client.HttpClient().get(url, params=params)
         if resp.status_code == 200:
             return resp.json()
 
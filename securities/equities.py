@@ -1,9 +1,7 @@
 import os
 import json
 import time
-import aiohttp
 import asyncio
-import requests
 import datetime
 import urllib
 import numpy as np
@@ -16,6 +14,10 @@ from dateutil.relativedelta import relativedelta
 
 import wrappers.eod_wrapper as eod_wrapper
 import wrappers.aiohttp_wrapper as aiohttp_wrapper
+import wrappers.http_client as http_client
+import db.fundamentals_cache as fundamentals_cache
+import db.ohlcv_cache as ohlcv_cache
+import db.identifier_index as identifier_index
 
 class Equities():
 
@@ -23,27 +25,50 @@ class Equities():
         self.data_clients = data_clients
         self.eod_client = data_clients["eod_client"]
         self.db_service = db_service
+        self.fundamentals_cache = fundamentals_cache.FundamentalsCache(
+            fetcher=lambda ticker, exchange: eod_wrapper.get_fundamental_data(eod_client=self.eod_client, ticker=ticker, exchange=exchange),
+            db_service=db_service,
+            **((db_service.db_config.get("fundamentals_cache") or {}) if db_service is not None else {})
+        )
+        ohlcv_cache_config = db_service.db_config.get("ohlcv_cache") if db_service is not None else None
+        self.ohlcv_cache = ohlcv_cache.OhlcvCache(
+            db_service=db_service, root=db_service.db_config.get("root"), **ohlcv_cache_config
+        ) if ohlcv_cache_config else None
+        self.identifier_index = identifier_index.IdentifierIndex(
+            db_service=db_service,
+            resolver=lambda ticker, exchange: self.get_identification_codes(ticker=ticker, exchange=exchange),
+            asyn_resolver=lambda ticker, exchange: self.asyn_get_identification_codes(ticker=ticker, exchange=exchange),
+            asyn_batch_resolver=lambda tickers, exchanges: self.asyn_batch_get_identification_codes(tickers=tickers, exchanges=exchanges)
+        )
     
     """
     Master Utilities
     """
     def get_sec_tickers(self):
         url = 'https://www.sec.gov/files/company_tickers.json'
-        resp = requests.get(url=url, params=None)
+        resp = http_client.HttpClient().get(url=url, params=None)
         data = resp.json()
         df = pd.DataFrame(data).transpose()
         return df
 
     def get_us_securities(self):
-        resp = self.eod_client.get_exchange_symbols(exchange='US')
-        df = pd.DataFrame(resp)
-        return df
+        url = "https://eodhistoricaldata.com/api/exchange-symbol-list/{}".format("US")
+        params = {"api_token": os.getenv('EOD_KEY'), "fmt": "json"}
+        resp = http_client.HttpClient().get(url=url, params=params)
+        if resp.status_code == 200:
+            return pd.DataFrame(resp.json())
 
     """
     Fundamentals
     """
     def get_fundamentals_dump(self, ticker, exchange, read_db=False, insert_db=False, expire_db=10):
-        return eod_wrapper.get_fundamental_data(eod_client=self.eod_client, ticker=ticker, exchange=exchange)
+        return self.fundamentals_cache.get(ticker=ticker, exchange=exchange, read_db=read_db, insert_db=insert_db, expire_db=expire_db)
+
+    def get_fundamentals_section(self, ticker, exchange, section, read_db=None, insert_db=None, expire_db=None):
+        """
+        read_db / insert_db / expire_db default to the cache's, set from db_config["fundamentals_cache"]
+        """
+        return self.fundamentals_cache.get_section(ticker=ticker, exchange=exchange, section=section, read_db=read_db, insert_db=insert_db, expire_db=expire_db)
          
     """
     Fundamentals::General Information
@@ -62,7 +87,7 @@ class Equities():
             if not read_db or expire_db <= 0 or not exists or expired:
                 url = "https://eodhistoricaldata.com/api/fundamentals/{}.{}".format(ticker, exchange)
                 params = {"api_token": os.getenv('EOD_KEY'), "filter":"General"}
-                resp = requests.get(url, params=params)
+                resp = http_client.HttpClient().get(url, params=params)
                 docdata = resp.json()
                 if insert_db:
                     self.db_service.insert_docs(dtype="equity", dformat="fundamentals", dfreq="irregular", docdata=docdata, doc_identifier=doc_identifier, metalogs=ticker)
@@ -84,9 +109,7 @@ class Equities():
             if not read_db or expire_db <= 0 or not exists or expired:
                 url = "https://eodhistoricaldata.com/api/fundamentals/{}.{}".format(ticker, exchange)
                 params = {"api_token": os.getenv('EOD_KEY'), "filter":"General"}
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url=url, params=params) as resp:
-                        docdata = await resp.json()
+                docdata = await http_client.HttpClient().asyn_get_json(url, params=params)
                 if insert_db:
                     await self.db_service.asyn_insert_docs(dtype="equity", dformat="fundamentals", dfreq="irregular", docdata=docdata, doc_identifier=doc_identifier, metalogs=ticker)
         except Exception:
@@ -210,11 +233,45 @@ class Equities():
             })
         return batch_codes
 
+    async def asyn_refresh_identifier_index(self, exchange="US", tickers=None, with_generals=True, max_in_flight=4):
+        """
+        bulk refresh of the identifier index, isin from the exchange symbol list then cusip/cik from bulk generals,
+        changed entries are written to the identifiers collection in batches, returns the number of changed entries
+        """
+        await self.identifier_index.asyn_load()
+        changed, partial = set(), False
+        if tickers is None:
+            symbols = await self.asyn_get_exchange_symbols(exchange=exchange)
+            if symbols is None:
+                db_logs.DBLogs().critical("asyn_refresh_identifier_index symbol list FAILED {}, isin refresh skipped".format(exchange))
+                partial = True
+            else:
+                changed.update(self.identifier_index.refresh_from_symbols(symbols, exchange))
+        if with_generals:
+            bulk, failures = await self.asyn_batch_get_bulk_fundamentals(exchange=exchange, tickers=tickers, max_in_flight=max_in_flight, return_failures=True)
+            if failures:
+                # the pages that did arrive are complete entries, they are written and the missing ones keep their indexed codes
+                db_logs.DBLogs().critical("asyn_refresh_identifier_index PARTIAL generals {} {} failed pages".format(exchange, len(failures)))
+                partial = True
+            changed.update(self.identifier_index.refresh_from_generals({ticker: entry["General"] for ticker, entry in bulk.items()}, exchange))
+        await self.identifier_index.asyn_write(sorted(changed))
+        db_logs.DBLogs().info("{} asyn_refresh_identifier_index {} changed {}".format("partial" if partial else "successful", exchange, len(changed)))
+        return len(changed)
+
+    async def asyn_get_exchange_symbols(self, exchange="US"):
+        """
+        exchange symbol list records (Code, Name, Isin...) through the async fetch layer, None when the request failed
+        """
+        url = "https://eodhistoricaldata.com/api/exchange-symbol-list/{}?".format(exchange)
+        params = {"api_token": os.getenv('EOD_KEY'), "fmt": "json"}
+        result = (await aiohttp_wrapper.async_aiohttp_get_all([url + urllib.parse.urlencode(params)]))[0]
+        return result if isinstance(result, list) else None
+
     """
     Fundamentals::Snapshots
     """
     def get_ticker_highlights(self, ticker, exchange):
-        return self.eod_client.get_fundamental_equity("{}.{}".format(ticker, exchange), filter_='Highlights')
+        return self.get_fundamentals_section(ticker=ticker, exchange=exchange, section="Highlights")
 
     def get_ticker_mcap(self, ticker, exchange):
         highlights = self.get_ticker_highlights(ticker=ticker, exchange=exchange)
@@ -306,7 +363,7 @@ class Equities():
         return highlights["WallStreetTargetPrice"]
 
     def get_ticker_valuation(self, ticker, exchange):
-        return self.eod_client.get_fundamental_equity("{}.{}".format(ticker, exchange), filter_='Valuation')
+        return self.get_fundamentals_section(ticker=ticker, exchange=exchange, section="Valuation")
    
     def get_ticker_trailing_pe(self, ticker, exchange):
         return self.get_ticker_valuation(ticker=ticker, exchange=exchange)["TrailingPE"]
@@ -333,7 +390,7 @@ class Equities():
     Fundamentals::Time Series Earnings and Financials
     """
     def get_ticker_earnings(self, ticker, exchange):
-        return self.eod_client.get_fundamental_equity("{}.{}".format(ticker, exchange), filter_='Earnings')
+        return self.get_fundamentals_section(ticker=ticker, exchange=exchange, section="Earnings")
 
     def get_ticker_earnings_history(self, ticker, exchange):
         resp = self.get_ticker_earnings(ticker=ticker, exchange=exchange)["History"]
@@ -348,7 +405,7 @@ class Equities():
         return pd.DataFrame(resp).transpose().iloc[::-1]
 
     def get_ticker_financials(self, ticker, exchange):
-        return self.eod_client.get_fundamental_equity("{}.{}".format(ticker, exchange), filter_='Financials')
+        return self.get_fundamentals_section(ticker=ticker, exchange=exchange, section="Financials")
 
     def get_ticker_income_statement(self, ticker, exchange, option="q"):
         resp = self.get_ticker_financials(ticker, exchange)["Income_Statement"]
@@ -380,27 +437,43 @@ class Equities():
             "api_token": os.getenv('EOD_KEY'), 
             "from":"2000-01-01"
         }
-        resp = requests.get(url, params=params)
+        resp = http_client.HttpClient().get(url, params=params)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json()).transpose().reset_index(drop=True).set_index("date")
+
+    async def asyn_batch_get_ticker_historical_mcap(self, tickers, exchanges, max_in_flight=50):
+        request_urls = []
+        for ticker, exchange in zip(tickers, exchanges):
+            url = 'https://eodhistoricaldata.com/api/historical-market-cap/{}.{}?'.format(ticker, exchange)
+            params = {"api_token": os.getenv('EOD_KEY'), "from": "2000-01-01"}
+            request_urls.append(url + urllib.parse.urlencode(params))
+        request_results = await aiohttp_wrapper.async_aiohttp_get_all(request_urls, max_in_flight=max_in_flight)
+        mcaps = []
+        for ticker, result in zip(tickers, request_results):
+            if not result:
+                db_logs.DBLogs().critical("asyn_batch_get_ticker_historical_mcap FAILED {}".format(ticker))
+                mcaps.append(None)
+                continue
+            mcaps.append(pd.DataFrame(result).transpose().reset_index(drop=True).set_index("date"))
+        return mcaps
     
     """
     Fundamentals::Share Statistics
     """
     def get_ticker_shares_stat(self, ticker, exchange):
-        return self.eod_client.get_fundamental_equity("{}.{}".format(ticker, exchange), filter_='SharesStats')
+        return self.get_fundamentals_section(ticker=ticker, exchange=exchange, section="SharesStats")
 
     def get_ticker_shares_outstanding(self, ticker, exchange):
-        return self.get_ticker_shares_stat(ticker=ticker)["SharesOutstanding"]
+        return self.get_ticker_shares_stat(ticker=ticker, exchange=exchange)["SharesOutstanding"]
 
     def get_ticker_shares_float(self, ticker, exchange):
-        return self.get_ticker_shares_stat(ticker=ticker)["SharesFloat"]
+        return self.get_ticker_shares_stat(ticker=ticker, exchange=exchange)["SharesFloat"]
 
     def get_ticker_insider_percent(self, ticker, exchange):
-        return self.get_ticker_shares_stat(ticker=ticker)["PercentInsiders"]
+        return self.get_ticker_shares_stat(ticker=ticker, exchange=exchange)["PercentInsiders"]
 
     def get_ticker_institutional_percent(self, ticker, exchange):
-        return self.get_ticker_shares_stat(ticker=ticker)["PercentInstitutions"]
+        return self.get_ticker_shares_stat(ticker=ticker, exchange=exchange)["PercentInstitutions"]
 
     def get_ticker_shorts(self, ticker, exchange):
         shares_stat = self.get_ticker_shares_stat(ticker=ticker, exchange=exchange)
@@ -417,7 +490,7 @@ class Equities():
     Fundamentals::Technicals
     """
     def get_ticker_technicals(self, ticker, exchange):
-        return self.eod_client.get_fundamental_equity("{}.{}".format(ticker, exchange), filter_='Technicals')
+        return self.get_fundamentals_section(ticker=ticker, exchange=exchange, section="Technicals")
 
     def get_ticker_beta(self, ticker, exchange):
         return self.get_ticker_technicals(ticker=ticker, exchange=exchange)["Beta"]
@@ -431,7 +504,7 @@ class Equities():
     Fundamentals::Splits and Dividends
     """
     def get_ticker_splits_and_divvies(self, ticker, exchange):
-        return self.eod_client.get_fundamental_equity("{}.{}".format(ticker, exchange), filter_='SplitsDividends')
+        return self.get_fundamentals_section(ticker=ticker, exchange=exchange, section="SplitsDividends")
 
     def get_ticker_yearly_payout_frequency(self, ticker, exchange):
         resp = self.get_ticker_splits_and_divvies(ticker=ticker, exchange=exchange)["NumberDividendsByYear"]
@@ -459,13 +532,13 @@ class Equities():
     Fundamentals::Institutional Rating and Analysts
     """
     def get_ticker_ratings(self, ticker, exchange):
-        return self.eod_client.get_fundamental_equity("{}.{}".format(ticker, exchange), filter_='AnalystRatings')
+        return self.get_fundamentals_section(ticker=ticker, exchange=exchange, section="AnalystRatings")
     
     """
     Fundamentals::Institutional and Insider Holdings/Transactions
     """
     def get_ticker_institutionals(self, ticker, exchange):
-        resp = self.eod_client.get_fundamental_equity("{}.{}".format(ticker, exchange), filter_='Holders')
+        resp = self.get_fundamentals_section(ticker=ticker, exchange=exchange, section="Holders")
         institutions = resp["Institutions"]
         funds = resp["Funds"]
         return {
@@ -481,7 +554,7 @@ class Equities():
             "limit":1000
         }
         if ticker: params["code"] = "{}.{}".format(ticker, exchange)
-        resp = requests.get(url, params=params)
+        resp = http_client.HttpClient().get(url, params=params)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json()).iloc[::-1].reset_index(drop=True)
 
@@ -489,7 +562,7 @@ class Equities():
     Fundamentals::Others
     """
     def get_ticker_esg_score(self, ticker, exchange):
-        resp = self.eod_client.get_fundamental_equity("{}.{}".format(ticker, exchange), filter_='ESGScores')
+        resp = self.get_fundamentals_section(ticker=ticker, exchange=exchange, section="ESGScores")
         pass #beta version
 
     """
@@ -504,7 +577,7 @@ class Equities():
             "from": (datetime.datetime.today() - datetime.timedelta(days = 365)).strftime('%Y-%m-%d'),
             "to": (datetime.datetime.today() + datetime.timedelta(days = 365)).strftime('%Y-%m-%d')
         }
-        resp = requests.get(url, params=params)
+        resp = http_client.HttpClient().get(url, params=params)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json()["earnings"])
 
@@ -517,7 +590,7 @@ class Equities():
             "from": "1990-01-01",
             "to": (datetime.datetime.today() + datetime.timedelta(days = 90)).strftime('%Y-%m-%d')
         }
-        resp = requests.get(url, params=params)
+        resp = http_client.HttpClient().get(url, params=params)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json()["trends"][0]).iloc[::-1].reset_index(drop=True)
         else:
@@ -531,7 +604,7 @@ class Equities():
             "from": (datetime.datetime.today() - datetime.timedelta(days = 365)).strftime('%Y-%m-%d'),
             "to": (datetime.datetime.today() + datetime.timedelta(days = 365)).strftime('%Y-%m-%d')
         }
-        resp = requests.get(url, params=params)
+        resp = http_client.HttpClient().get(url, params=params)
         return pd.DataFrame(resp.json()["ipos"])
        
     def get_nearby_splits(self):
@@ -542,7 +615,7 @@ class Equities():
             "from": (datetime.datetime.today() - relativedelta(months = 6)).strftime('%Y-%m-%d'),
             "to": (datetime.datetime.today() + relativedelta(months = 6)).strftime('%Y-%m-%d')
         }
-        resp = requests.get(url, params=params)
+        resp = http_client.HttpClient().get(url, params=params)
         return pd.DataFrame(resp.json()["splits"])
 
     def get_historical_splits(self, ticker, exchange="US"):
@@ -551,7 +624,7 @@ class Equities():
             "api_token": os.getenv('EOD_KEY'), 
             "fmt": "json"
         }
-        resp = requests.get(url, params=params)
+        resp = http_client.HttpClient().get(url, params=params)
         return pd.DataFrame(resp.json()).reset_index(drop=True).set_index("date")
 
     def get_historical_dividends(self, ticker, exchange="US"):
@@ -560,19 +633,142 @@ class Equities():
             "api_token": os.getenv('EOD_KEY'), 
             "fmt": "json"
         }
-        resp = requests.get(url, params=params)
+        resp = http_client.HttpClient().get(url, params=params)
         return pd.DataFrame(resp.json()).reset_index(drop=True).set_index("date")
 
-    def get_bulk_fundamentals(self, tickers, exchange="US"):
-        url = "http://eodhistoricaldata.com/api/bulk-fundamentals/NASDAQ"
-        params = {
-            "api_token": os.getenv('EOD_KEY'), 
-            "fmt": "json",
-            "offset": 500,
-            "limit": 500
-        }
-        resp = requests.get(url, params=params)
-        return resp.json()
+    def get_bulk_fundamentals(self, exchange="US", tickers=None, offset=0, limit=500):
+        url = "https://eodhistoricaldata.com/api/bulk-fundamentals/{}".format(exchange)
+        params = Equities._bulk_fundamentals_params(exchange=exchange, tickers=tickers, offset=offset, limit=limit)
+        resp = http_client.HttpClient().get(url, params=params)
+        return Equities._parse_bulk_fundamentals(resp.json())
+
+    @staticmethod
+    def _bulk_fundamentals_params(exchange, tickers=None, offset=0, limit=500):
+        params = {"api_token": os.getenv('EOD_KEY'), "fmt": "json", "offset": offset, "limit": limit}
+        if tickers:
+            params["symbols"] = ",".join("{}.{}".format(ticker, exchange) for ticker in tickers)
+        return params
+
+    @staticmethod
+    def _parse_bulk_fundamentals(resp):
+        """
+        bulk entries keep General, Highlights and Financials, the Financials statements are reshaped from
+        {"quarterly_last_0": {"date": ..}, ..} into the {"quarterly": {date: ..}, "yearly": {date: ..}} layout of the fundamentals endpoint
+        """
+        entries = resp.values() if isinstance(resp, dict) else (resp or [])
+        bulk = {}
+        for entry in entries:
+            if not isinstance(entry, dict) or not entry.get("General"):
+                continue
+            financials = {}
+            for statement, values in (entry.get("Financials") or {}).items():
+                reshaped = {"quarterly": {}, "yearly": {}}
+                for key, value in (values or {}).items():
+                    period = key.split("_last_")[0]
+                    if period in reshaped and isinstance(value, dict) and value.get("date"):
+                        reshaped[period][value["date"]] = value
+                    elif period not in reshaped:
+                        reshaped[key] = value
+                financials[statement] = reshaped
+            bulk[entry["General"]["Code"]] = {
+                "General": entry["General"],
+                "Highlights": entry.get("Highlights") or {},
+                "Financials": financials
+            }
+        return bulk
+
+    @staticmethod
+    def _bulk_page_size(result):
+        """
+        number of entries of a bulk-fundamentals payload, None for a failed request or an error payload
+        """
+        if isinstance(result, list):
+            return len(result)
+        if isinstance(result, dict) and all(isinstance(entry, dict) for entry in result.values()):
+            return len(result)
+        return None
+
+    @staticmethod
+    async def _asyn_fetch_bulk_pages(url, pages_params, max_in_flight, retries=3):
+        """
+        {page: payload} for the pages that returned entries, failed pages (None or error payload) are refetched
+        with the fetch layer's backoff, the pages still failing after retries are returned apart
+        """
+        results, pending = {}, list(range(len(pages_params)))
+        for tries in range(retries + 1):
+            if tries > 0:
+                db_logs.DBLogs().warning("asyn_batch_get_bulk_fundamentals RETRY {} {} pages".format(tries, len(pending)))
+                await asyncio.sleep(aiohttp_wrapper.backoff(tries - 1))
+            request_urls = [url + urllib.parse.urlencode(pages_params[i]) for i in pending]
+            failed = []
+            for i, result in zip(pending, await aiohttp_wrapper.async_aiohttp_get_all(request_urls, max_in_flight=max_in_flight)):
+                if Equities._bulk_page_size(result) is None:
+                    failed.append(i)
+                else:
+                    results[i] = result
+            pending = failed
+            if not pending:
+                break
+        return results, pending
+
+    async def asyn_batch_get_bulk_fundamentals(self, exchange="US", tickers=None, limit=500, max_in_flight=4, insert_db=False, return_failures=False):
+        """
+        pages through the bulk-fundamentals endpoint, by `symbols` chunks when tickers are given else by offset until a short page
+        returns {ticker: {"General", "Highlights", "Financials"}}, with insert_db the sections are written as
+        ticker_generals (read back by get_ticker_generals), ticker_highlights and ticker_financials docs
+        pages failing after retries are logged and skipped, return_failures returns (bulk, failures) with the
+        failed ticker chunks or offsets so that callers can tell a partial exchange from a complete one
+        """
+        url = "https://eodhistoricaldata.com/api/bulk-fundamentals/{}?".format(exchange)
+        bulk = {}
+        failures = []
+        if tickers:
+            tickers = list(tickers)
+            chunks = [tickers[i:i + limit] for i in range(0, len(tickers), limit)]
+            results, failed = await Equities._asyn_fetch_bulk_pages(
+                url, [Equities._bulk_fundamentals_params(exchange=exchange, tickers=chunk, limit=limit) for chunk in chunks], max_in_flight
+            )
+            for i in sorted(results):
+                bulk.update(Equities._parse_bulk_fundamentals(results[i]))
+            failures = [chunks[i] for i in failed]
+        else:
+            offset, end = 0, None
+            while end is None:
+                offsets = [offset + i * limit for i in range(max_in_flight)]
+                offset += max_in_flight * limit
+                results, failed = await Equities._asyn_fetch_bulk_pages(
+                    url, [Equities._bulk_fundamentals_params(exchange=exchange, offset=page_offset, limit=limit) for page_offset in offsets], max_in_flight
+                )
+                for i in sorted(results):
+                    bulk.update(Equities._parse_bulk_fundamentals(results[i]))
+                    if Equities._bulk_page_size(results[i]) < limit and end is None:
+                        end = offsets[i]
+                failures += [offsets[i] for i in failed]
+                if not results:
+                    # a whole wave failing after retries, the end of the exchange is unknown
+                    end = offsets[0]
+            failures = [failure for failure in failures if failure <= end]
+
+        if failures:
+            db_logs.DBLogs().critical("asyn_batch_get_bulk_fundamentals FAILED {} pages {} {}".format(len(failures), exchange, failures if not tickers else [chunk[0] for chunk in failures]))
+
+        if insert_db and bulk:
+            insert_tickers = list(bulk.keys())
+            for section, doc_type in [("General", "ticker_generals"), ("Highlights", "ticker_highlights"), ("Financials", "ticker_financials")]:
+                doc_identifiers = [{
+                    "type": doc_type,
+                    "ticker": ticker,
+                    "exchange": exchange,
+                    "source": "eodhistoricaldata"
+                } for ticker in insert_tickers]
+                await self.db_service.asyn_batch_insert_docs(
+                    dtype="equity", dformat="fundamentals", dfreq="irregular",
+                    docdatas=[bulk[ticker][section] for ticker in insert_tickers],
+                    doc_identifiers=doc_identifiers, metalogs=insert_tickers
+                )
+        if return_failures:
+            return bulk, failures
+        return bulk
 
     """
     Events::Sentiment and News
@@ -588,7 +784,7 @@ class Equities():
         query_key = "s" if ticker else "t"
         query_value = "{}.{}".format(ticker, exchange) if query_key == "s" else tag
         params.update({query_key:query_value})
-        resp = requests.get(url, params=params)
+        resp = http_client.HttpClient().get(url, params=params)
         df = pd.DataFrame(resp.json())
         df[df["sentiment"].apply(pd.Series).columns] = df["sentiment"].apply(pd.Series)
         return df.iloc[::-1].reset_index(drop=True).set_index("date")
@@ -609,7 +805,7 @@ class Equities():
     def get_ohlcv(self, ticker, exchange, period_end=datetime.datetime.today(), period_start=None,period_days=3650, read_db=False, insert_db=False):
         series_df = None
         try:
-            id_codes = self.get_identification_codes(ticker=ticker, exchange=exchange)
+            id_codes = self.identifier_index.get(ticker=ticker, exchange=exchange)
             series_metadata, series_identifier = self._get_series_identifiers_and_metadata(
                 isin=id_codes["isin"],
                 ticker=ticker,
@@ -618,12 +814,19 @@ class Equities():
             )
             if read_db:
                 period_start = period_start if period_start else period_end - datetime.timedelta(days=period_days)
-                exists, series_df = self.db_service.read_timeseries(
-                    dtype="equity", dformat="spot", dfreq="1d", 
-                    series_metadata=series_metadata, series_identifier=series_identifier, metalogs=ticker,
-                    period_start=period_start,
-                    period_end=period_end
-                )
+                if self.ohlcv_cache is not None:
+                    exists, series_df = self.ohlcv_cache.read_timeseries(
+                        series_metadata=series_metadata, series_identifier=series_identifier, metalogs=ticker,
+                        period_start=period_start,
+                        period_end=period_end
+                    )
+                else:
+                    exists, series_df = self.db_service.read_timeseries(
+                        dtype="equity", dformat="spot", dfreq="1d", 
+                        series_metadata=series_metadata, series_identifier=series_identifier, metalogs=ticker,
+                        period_start=period_start,
+                        period_end=period_end
+                    )
             if not read_db or not exists:
                 series_df = eod_wrapper.get_ohlcv(ticker=ticker, exchange=exchange, period_end=period_end, period_start=period_start, period_days=period_days)
                 if not insert_db:
@@ -631,6 +834,8 @@ class Equities():
                 elif insert_db and len(series_df) > 0:
                     self.db_service.insert_timeseries_df(dtype="equity", dformat="spot", dfreq="1d", 
                                     df=series_df, series_identifier=series_identifier, series_metadata=series_metadata, metalogs=ticker)
+                    if self.ohlcv_cache is not None:
+                        self.ohlcv_cache.invalidate(series_identifier)
                     db_logs.DBLogs().info("successful get_ohlcv with db write {}".format(ticker))
                 elif insert_db and len(series_df) == 0:
                     db_logs.DBLogs().info("successful get_ohlcv but skipped with len-0 insert {}".format(ticker))
@@ -643,7 +848,7 @@ class Equities():
     async def asyn_get_ohlcv(self, ticker, exchange, period_end=datetime.datetime.today(), period_start=None, period_days=3650, read_db=False, insert_db=False, tries=0):
         series_df = None
         try:
-            id_codes = await self.asyn_get_identification_codes(ticker=ticker, exchange=exchange)
+            id_codes = await self.identifier_index.asyn_get(ticker=ticker, exchange=exchange)
             series_metadata, series_identifier = self._get_series_identifiers_and_metadata(
                 isin=id_codes["isin"], 
                 ticker=ticker, 
@@ -651,12 +856,19 @@ class Equities():
                 source="eodhistoricaldata")
             if read_db:
                 period_start = period_start if period_start else period_end - datetime.timedelta(days=period_days)
-                exists, series_df = await self.db_service.asyn_read_timeseries(
-                    dtype="equity", dformat="spot", dfreq="1d", 
-                    series_metadata=series_metadata, series_identifier=series_identifier, metalogs=ticker,
-                    period_start=period_start,
-                    period_end=period_end
-                )
+                if self.ohlcv_cache is not None:
+                    exists, series_df = await self.ohlcv_cache.asyn_read_timeseries(
+                        series_metadata=series_metadata, series_identifier=series_identifier, metalogs=ticker,
+                        period_start=period_start,
+                        period_end=period_end
+                    )
+                else:
+                    exists, series_df = await self.db_service.asyn_read_timeseries(
+                        dtype="equity", dformat="spot", dfreq="1d", 
+                        series_metadata=series_metadata, series_identifier=series_identifier, metalogs=ticker,
+                        period_start=period_start,
+                        period_end=period_end
+                    )
             if not read_db or not exists:
                 series_df = await eod_wrapper.asyn_get_ohlcv(ticker=ticker, exchange=exchange, period_end=period_end, period_start=period_start, period_days=period_days)
                 if not insert_db:
@@ -664,6 +876,8 @@ class Equities():
                 elif insert_db and len(series_df) > 0:
                     await self.db_service.asyn_insert_timeseries_df(dtype="equity", dformat="spot", dfreq="1d", 
                                     df=series_df, series_identifier=series_identifier, series_metadata=series_metadata, metalogs=ticker)
+                    if self.ohlcv_cache is not None:
+                        await self.ohlcv_cache.asyn_invalidate([series_identifier])
                     db_logs.DBLogs().info("successful asyn_get_ohlcv with db write {}".format(ticker))
                 elif insert_db and len(series_df) == 0:
                     db_logs.DBLogs().info("successful asyn_get_ohlcv but skipped with len-0 insert {}".format(ticker))
@@ -680,9 +894,10 @@ class Equities():
         period_end=datetime.datetime.today(), period_start=None, period_days=3650, 
         read_db=False, insert_db=False):
         
-        id_codess = await self.asyn_batch_get_identification_codes(tickers=tickers, exchanges=exchanges)
+        id_codess = await self.identifier_index.asyn_batch_get(tickers=tickers, exchanges=exchanges)
         series_metadatas, series_identifiers = [], []
 
+        working_ids = []
         working_tickers =[]
         working_exchanges =[]
         for i in range(len(tickers)):
@@ -695,65 +910,105 @@ class Equities():
                     source="eodhistoricaldata")
                 series_metadatas.append(series_metadata)
                 series_identifiers.append(series_identifier)
+                working_ids.append(i)
                 working_tickers = working_tickers+[tickers[i]]
                 working_exchanges = working_exchanges+[exchanges[i]]
 
             except:
                 ''
 
+        period_start = period_start if period_start else period_end - datetime.timedelta(days=period_days)
+        existss = [False for _ in range(len(working_tickers))]
+        series_dfs = [pd.DataFrame() for _ in range(len(working_tickers))]
+        series_ranges = [(None, None) for _ in range(len(working_tickers))]
         if read_db:
-            period_start = period_start if period_start else period_end - datetime.timedelta(days=period_days)
-            existss, series_dfs = await self.db_service.asyn_batch_read_timeseries(
+            existss, series_dfs, series_ranges = await self.db_service.asyn_batch_read_timeseries(
                 dtype="equity", dformat="spot", dfreq="1d", 
-                series_metadatas=series_metadatas, series_identifiers=series_identifiers, metalogs=tickers,
+                series_metadatas=series_metadatas, series_identifiers=series_identifiers, metalogs=working_tickers,
                 period_start=period_start,
-                period_end=period_end
+                period_end=period_end,
+                return_ranges=True
             )
         
-        request_tickers, request_exchanges, request_metadatas, request_identifiers = [], [], [], []
+        # only the head/tail ranges not covered by the -meta time_start/time_end are requested,
+        # boundary bars are requested again so that the insert stays contiguous with the stored series
+        request_ids, request_tickers, request_exchanges, request_starts, request_ends = [], [], [], [], []
         for i in range(len(working_tickers)):
-            if not read_db or not existss[i]:
+            if existss[i]:
+                continue
+            record_start, record_end = series_ranges[i]
+            if not record_start or not record_end:
+                spans = [(period_start, period_end)]
+            else:
+                spans = []
+                if period_start < record_start:
+                    spans.append((period_start, record_start))
+                if period_end > record_end:
+                    spans.append((record_end, period_end))
+            for span_start, span_end in spans:
+                request_ids.append(i)
                 request_tickers.append(working_tickers[i])
                 request_exchanges.append(working_exchanges[i])
-                request_metadatas.append(series_metadatas[i])
-                request_identifiers.append(series_identifiers[i])
+                request_starts.append(span_start)
+                request_ends.append(span_end)
 
         request_results = await eod_wrapper.asyn_batch_get_ohlcv(
             tickers=request_tickers, 
             exchanges=request_exchanges, 
-            period_end=period_end, 
-            period_start=period_start, 
-            period_days=period_days
+            period_starts=request_starts, 
+            period_ends=request_ends
         )
 
+        fetched_dfs = defaultdict(list)
+        failed_ids = set()
+        for j in range(len(request_ids)):
+            if request_results[j] is None:
+                db_logs.DBLogs().critical("asyn_batch_get_ohlcv FAILED {}".format(request_tickers[j]))
+                failed_ids.add(request_ids[j])
+            elif len(request_results[j]) == 0:
+                db_logs.DBLogs().info("successful asyn_batch_get_ohlcv with len-0 span {}".format(request_tickers[j]))
+            else:
+                fetched_dfs[request_ids[j]].append(request_results[j])
+
         ohlcvs = []
-        j = 0
+        insert_ids = []
         for i in range(len(working_tickers)):
-            if not read_db or not existss[i]:
-                if request_results[j] is None:
-                    db_logs.DBLogs().critical("asyn_batch_get_ohlcv FAILED {}".format(request_tickers[j]))
-                ohlcvs.append(['no data'])
-                j += 1
-            else:
-                ohlcvs.append(series_dfs[i])
+            db_df = series_dfs[i] if series_dfs[i] is not None else pd.DataFrame()
+            if i not in fetched_dfs:
+                ohlcvs.append(db_df if len(db_df) > 0 or i not in failed_ids else None)
+                continue
+            if i not in failed_ids:
+                insert_ids.append(i)
+            ohlcvs.append(
+                pd.concat(([db_df] if len(db_df) > 0 else []) + fetched_dfs[i], axis=0)
+                .drop_duplicates("datetime", keep="first")
+                .sort_values("datetime")
+                .reset_index(drop=True)
+            )
 
         if insert_db:
             insert_tickers, insert_ohlcvs, insert_series_metadatas, insert_series_identifiers = [], [], [], []
-            for i in range(len(request_tickers)):
-                if request_results[i] is None:
-                    pass
-                elif request_results[i] is not None and len(request_results[i]) == 0:
-                    db_logs.DBLogs().info("successful asyn_get_ohlcv but skipped with len-0 insert {}".format(request_tickers[i]))
-                elif request_results[i] is not None and len(request_results[i]) > 0:
-                    insert_tickers.append(request_tickers[i])
-                    insert_ohlcvs.append(request_results[i])
-                    insert_series_metadatas.append(request_metadatas[i])
-                    insert_series_identifiers.append(request_identifiers[i])
+            for i in insert_ids:
+                insert_tickers.append(working_tickers[i])
+                insert_ohlcvs.append(
+                    pd.concat(fetched_dfs[i], axis=0)
+                    .drop_duplicates("datetime")
+                    .sort_values("datetime")
+                    .reset_index(drop=True)
+                )
+                insert_series_metadatas.append(series_metadatas[i])
+                insert_series_identifiers.append(series_identifiers[i])
             
-            await self.db_service.asyn_batch_insert_timeseries_df(dtype="equity", dformat="spot", dfreq="1d", 
-                    dfs=insert_ohlcvs, series_identifiers=insert_series_identifiers, series_metadatas=insert_series_metadatas, metalogs=insert_tickers)
-
-        return ohlcvs
+            if insert_ohlcvs:
+                await self.db_service.asyn_batch_insert_timeseries_df(dtype="equity", dformat="spot", dfreq="1d", 
+                        dfs=insert_ohlcvs, series_identifiers=insert_series_identifiers, series_metadatas=insert_series_metadatas, metalogs=insert_tickers)
+                if self.ohlcv_cache is not None:
+                    await self.ohlcv_cache.asyn_invalidate(insert_series_identifiers)
+
+        batch_ohlcvs = [None for _ in range(len(tickers))]
+        for i, ohlcv in zip(working_ids, ohlcvs):
+            batch_ohlcvs[i] = ohlcv
+        return batch_ohlcvs
 
     def get_live_lagged_prices(self, ticker="", exchange="US"):
         return eod_wrapper.get_live_lagged_prices(ticker=ticker, exchange=exchange)
@@ -1,6 +1,5 @@
 import os
 import json
-import requests
 import datetime
 import calendar
 import websockets
@@ -11,6 +10,7 @@ from dateutil.relativedelta import relativedelta
 from sockets.eod_sockclient import EodSocketClient
 
 import wrappers.eod_wrapper as eod_wrapper
+import wrappers.http_client as http_client
 
 class FixedIncome():
 
@@ -23,7 +23,7 @@ class FixedIncome():
         #Bonds fundamentals and historical data could be accessed either via ISIN or via CUSIP IDs
         url = 'https://eodhistoricaldata.com/api/bond-fundamentals/{}'.format(ticker)
         params = {"api_token": os.getenv('EOD_KEY')}
-        resp = requests.get(url, params=params)
+        resp = http_client.HttpClient().get(url, params=params)
         if resp.status_code == 200:
             return resp.json()
 
@@ -1,30 +1,32 @@
 import os
 import json
-import requests
 import datetime
 import calendar
+import importlib
 import numpy as np
 import pandas as pd
 
-import oandapyV20
-import oandapyV20.endpoints.instruments as instruments
-
 from dateutil.relativedelta import relativedelta
 
 import wrappers.eod_wrapper as eod_wrapper
+import wrappers.http_client as http_client
  
 class FX():
         
     def __init__(self, data_clients={}, db_service=None):
         self.data_clients = data_clients
         self.eod_client = data_clients["eod_client"]
-        self.oanda_client = data_clients["oanda_client"]
+
+    @property
+    def oanda_client(self):
+        # built on first use by an oanda method, the ECB / NORGE / eod methods run without oanda configured
+        return self.data_clients["oanda_client"]
 
     def get_ecb_interbank_fx_rate(self, ticker, exchange="MONEY"):
         # https://eodhistoricaldata.com/financial-apis/macroeconomic-data-api/
         url = "https://eodhistoricaldata.com/api/eod/ECB{}.{}".format(ticker, exchange)
         params = {"api_token": os.getenv('EOD_KEY'), "fmt": "json"}
-        resp = requests.get(url, params=params)
+        resp = http_client.HttpClient().get(url, params=params)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json())
 
@@ -32,7 +34,7 @@ class FX():
         # https://eodhistoricaldata.com/financial-apis/macroeconomic-data-api/
         url = "https://eodhistoricaldata.com/api/eod/NORGE{}.{}".format(ticker, exchange)
         params = {"api_token": os.getenv('EOD_KEY'), "fmt": "json"}
-        resp = requests.get(url, params=params)
+        resp = http_client.HttpClient().get(url, params=params)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json())
 
@@ -54,6 +56,7 @@ class FX():
         return eod_wrapper.get_intraday_data(ticker=ticker, exchange=exchange, interval=interval, to_utc=to_utc, period_days=period_days)
 
     def get_oan_ohlcv(self, ticker="", exchange="FOREX", period_end=datetime.datetime.today(), period_start="", period_days=1000): #inst, count, gran):
+        instruments = importlib.import_module("oandapyV20.endpoints.instruments")
         params = {"count": period_days,"granularity": "D"}
         candles = instruments.InstrumentsCandles(instrument=ticker, params=params)
         self.oanda_client.request(candles)
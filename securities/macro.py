@@ -1,13 +1,14 @@
 import os
 import re
 import json
-import requests
 import datetime
 import pandas as pd
 
 from cif import cif
 from dbnomics import fetch_series, fetch_series_by_api_link
 
+import wrappers.http_client as http_client
+
 class Macro():
 
     def __init__(self, data_clients={}, db_service=None):
@@ -28,7 +29,7 @@ class Macro():
         }
         if countryiso:
             params.update({"country": countryiso}) 
-        resp = requests.get(url=url, params=params)
+        resp = http_client.HttpClient().get(url=url, params=params)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json()).iloc[::-1].reset_index(drop=True).set_index("date")
 
@@ -39,14 +40,14 @@ class Macro():
             "api_token": os.getenv('EOD_KEY'),
             "indicator": indicator_code
         } 
-        resp = requests.get(url=url, params=params)
+        resp = http_client.HttpClient().get(url=url, params=params)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json()).iloc[::-1].reset_index(drop=True).set_index("Date")
 
     def get_rates_universe(self):
         url = 'https://eodhistoricaldata.com/api/exchange-symbol-list/{}'.format("MONEY")
         params = {"api_token": os.getenv('EOD_KEY'), "fmt": "json"}
-        resp = requests.get(url=url, params=params)
+        resp = http_client.HttpClient().get(url=url, params=params)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json()).loc[pd.DataFrame(resp.json())["Type"] == "Rate"]
 
@@ -57,7 +58,7 @@ class Macro():
             "api_token": os.getenv('EOD_KEY'),
             "fmt": "json"
         } 
-        resp = requests.get(url=url, params=params)
+        resp = http_client.HttpClient().get(url=url, params=params)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json()).reset_index(drop=True).set_index("date")
 
@@ -97,19 +98,19 @@ class Macro():
     #Note that other new API endpoints can be accessed similarly, see docs: https://fred.stlouisfed.org/docs/api/fred/
     def get_all_fred_data_tags(self):
         url = "https://api.stlouisfed.org/fred/tags?api_key={}&file_type=json".format(os.getenv("FRED_KEY"))
-        resp = requests.get(url=url)
+        resp = http_client.HttpClient().get(url=url)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json()["tags"])
 
     def get_all_fred_data_sources(self):
         url = "https://api.stlouisfed.org/fred/sources?api_key={}&file_type=json".format(os.getenv("FRED_KEY"))
-        resp = requests.get(url=url)
+        resp = http_client.HttpClient().get(url=url)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json()["sources"])    
 
     def get_all_fred_series_by_tags(self, tags=["usa"]):
         url = "https://api.stlouisfed.org/fred/tags/series?tag_names={}&api_key={}&file_type=json".format(";".join(tags), os.getenv("FRED_KEY"))
-        resp = requests.get(url=url)
+        resp = http_client.HttpClient().get(url=url)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json()["seriess"])
 
@@ -121,7 +122,7 @@ class Macro():
             "realtime_end" : realtime_end.strftime('%Y-%m-%d'),
             "file_type" : "json"
         }
-        resp = requests.get(url=url, params=params)
+        resp = http_client.HttpClient().get(url=url, params=params)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json()["releases"])
   
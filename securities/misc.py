@@ -1,11 +1,12 @@
 import os
 import json
-import requests
 import datetime
 import pandas as pd
 
 from sec_edgar_api import EdgarClient
 
+import wrappers.http_client as http_client
+
 class Miscellaneous():
 
     def __init__(self, data_clients={}, db_service=None):
@@ -19,20 +20,22 @@ class Miscellaneous():
         """
         url = "https://eodhistoricaldata.com/api/search/{}".format(search_request)
         params = {"api_token": os.getenv('EOD_KEY'), "limit": 50}
-        resp = requests.get(url=url, params=params)
+        resp = http_client.HttpClient().get(url=url, params=params)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json())
 
     def get_eod_exchanges(self):
-        resp = self.eod_client.get_exchanges()
-        df = pd.DataFrame(resp)
-        return df
+        url = "https://eodhistoricaldata.com/api/exchanges-list/"
+        params = {"api_token": os.getenv('EOD_KEY'), "fmt": "json"}
+        resp = http_client.HttpClient().get(url=url, params=params)
+        if resp.status_code == 200:
+            return pd.DataFrame(resp.json())
 
     def get_exchange_tickers(self, exchange="US", add_params={}):
         url = 'https://eodhistoricaldata.com/api/exchange-symbol-list/{}'.format(exchange)
         params = {"api_token": os.getenv('EOD_KEY'), "fmt": "json"}
         params.update(add_params)
-        resp = requests.get(url=url, params=params)
+        resp = http_client.HttpClient().get(url=url, params=params)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json())
     
@@ -43,7 +46,7 @@ class Miscellaneous():
         url = "https://eodhistoricaldata.com/api/exchange-details/{}".format(exchange)
         params = {"api_token": os.getenv('EOD_KEY')}
         params.update(add_params)
-        resp = requests.get(url=url, params=params)
+        resp = http_client.HttpClient().get(url=url, params=params)
         if resp.status_code == 200:
             return resp.json()
     
@@ -68,7 +71,7 @@ class Miscellaneous():
             "from": (period_end - datetime.timedelta(days=period_days)).strftime('%Y-%m-%d'),
             "to": period_end.strftime('%Y-%m-%d')
         }
-        resp = requests.get(url=url, params=params)
+        resp = http_client.HttpClient().get(url=url, params=params)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json()["{}.{}".format(ticker, exchange)]).iloc[::-1].reset_index(drop=True).set_index("date")
     
@@ -79,7 +82,7 @@ class Miscellaneous():
             "from": (period_end - datetime.timedelta(days=period_days)).strftime('%Y-%m-%d'),
             "to": period_end.strftime('%Y-%m-%d')
         }
-        resp = requests.get(url=url, params=params)
+        resp = http_client.HttpClient().get(url=url, params=params)
         if resp.status_code == 200:
             return pd.DataFrame(resp.json()["{}.{}".format(ticker, exchange)]).iloc[::-1].reset_index(drop=True).set_index("date")
 
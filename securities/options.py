@@ -1,6 +1,5 @@
 import os
 import json
-import requests
 import datetime
 import calendar
 import numpy as np
@@ -8,6 +7,8 @@ import pandas as pd
 
 from dateutil.relativedelta import relativedelta
 
+import wrappers.http_client as http_client
+
 class Options():
         
     def __init__(self, data_clients={}, db_service=None):
@@ -21,7 +22,7 @@ class Options():
             "api_token": os.getenv('EOD_KEY'),     
         }
         params.update(add_params)
-        resp = requests.get(url, params=params)
+        resp = http_client.HttpClient().get(url, params=params)
         if resp.status_code == 200:
             result = resp.json()
             last_traded_date = result["lastTradeDate"]
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+import utils.signals as signals
+
+def _aligned_values(weights, returns):
+    returns = returns.reindex_like(weights)
+    float32 = all(dtype == np.float32 for dtype in list(weights.dtypes) + list(returns.dtypes))
+    dtype = np.float32 if float32 else np.float64
+    return weights.to_numpy(dtype=dtype, na_value=np.nan), returns.to_numpy(dtype=dtype, na_value=np.nan)
+
+def _lagged(values, lag):
+    if lag == 0:
+        return values
+    held = np.empty_like(values)
+    held[:lag] = np.nan
+    held[lag:] = values[:-lag]
+    return held
+
+def sharpe(pnl, periods_per_year=252, active_only=True):
+    """
+    annualised mean/std, on the days with a non zero pnl by default as in the notebooks (pnl.replace({0:np.nan}).dropna())
+    """
+    pnl = pd.Series(pnl).astype(np.float64)
+    if active_only:
+        pnl = pnl[pnl != 0]
+    pnl = pnl.dropna()
+    if len(pnl) < 2 or pnl.std() == 0:
+        return np.nan
+    return pnl.mean() * np.sqrt(periods_per_year) / pnl.std()
+
+def drawdown(pnl):
+    """
+    drawdown of the cumulative (summed, not compounded) pnl, as plotted with pnl.cumsum()
+    """
+    cumulative = pd.Series(pnl).fillna(0).cumsum()
+    return cumulative - cumulative.cummax()
+
+def backtest(weights, returns, groups=None, cost_bps=0.0, lag=1, periods_per_year=252):
+    """
+    weights and returns are dates x assets frames, positions held on t are weights.shift(lag), NaN is flat / no return
+    float32 panels are kept float32, the per-day sums are accumulated in float64
+    returns {"daily": frame of gross_pnl/costs/pnl/long/short/gross/net/turnover, "stats": series,
+             "attribution": dates x groups pnl when groups (static series or dates x assets frame) is given}
+    """
+    w, r = _aligned_values(weights, returns)
+    held = np.nan_to_num(_lagged(w, lag), copy=(lag == 0))
+    r = np.nan_to_num(r)
+
+    contributions = held * r
+    gross_pnl = contributions.sum(axis=1, dtype=np.float64)
+    long = np.where(held > 0, held, 0).sum(axis=1, dtype=np.float64)
+    short = np.where(held < 0, held, 0).sum(axis=1, dtype=np.float64)
+    trades = np.empty_like(held)
+    trades[0] = held[0]
+    np.subtract(held[1:], held[:-1], out=trades[1:])
+    turnover = np.abs(trades).sum(axis=1, dtype=np.float64)
+    costs = turnover * cost_bps / 1e4
+
+    daily = pd.DataFrame({
+        "gross_pnl": gross_pnl,
+        "costs": costs,
+        "pnl": gross_pnl - costs,
+        "long": long,
+        "short": short,
+        "gross": long - short,
+        "net": long + short,
+        "turnover": turnover,
+    }, index=weights.index)
+
+    dd = drawdown(daily["pnl"])
+    active = daily["gross"] > 0
+    stats = pd.Series({
+        "sharpe": sharpe(daily["pnl"], periods_per_year=periods_per_year),
+        "sharpe_gross": sharpe(daily["gross_pnl"], periods_per_year=periods_per_year),
+        "annual_pnl": daily["pnl"][active].mean() * periods_per_year,
+        "annual_costs": daily["costs"][active].mean() * periods_per_year,
+        "avg_turnover": daily["turnover"][active].mean(),
+        "avg_gross": daily["gross"][active].mean(),
+        "avg_net": daily["net"][active].mean(),
+        "max_drawdown": dd.min(),
+        "active_days": int(active.sum()),
+    })
+
+    result = {"daily": daily, "stats": stats, "drawdown": dd}
+    if groups is not None:
+        codes, labels = signals.group_codes(groups, weights, return_labels=True)
+        codes = np.broadcast_to(codes, held.shape)
+        n_rows, n_groups = held.shape[0], len(labels)
+        grouped = codes >= 0
+        keys = (np.arange(n_rows)[:, None] * n_groups + np.where(grouped, codes, 0))[grouped]
+        attribution = np.bincount(keys, weights=contributions[grouped].astype(np.float64), minlength=n_rows * n_groups)
+        result["attribution"] = pd.DataFrame(attribution.reshape(n_rows, n_groups), index=weights.index, columns=labels)
+    return result
@@ -1,54 +1,40 @@
 import pandas as pd
 import numpy as np
 import datetime
+import asyncio
+import importlib
 import tqdm
-from data_master import DataMaster
+import utils.presence as presence
 import os
 from tqdm import tqdm
-from scipy.stats import norm
 
-master = DataMaster()
+# utils.kernels (numba), utils.store / utils.panel_cache / utils.panel (pyarrow) and scipy are imported
+# by the functions using them, importing utils.func only costs pandas
+_master = None
 
+def get_master():
+    """
+    the DataMaster used by the aggregate_* helpers, built (and data_master imported) on first use
+    """
+    global _master
+    if _master is None:
+        _master = importlib.import_module("data_master").DataMaster()
+    return _master
 
+def __getattr__(name):
+    # func.master still works for callers of the old module level instance
+    if name == "master":
+        return get_master()
+    raise AttributeError(name)
 
-def presence_matrix(df):
-    # create a list of dates starting from the earliest start date until today
-    start_date = min(df['StartDate'])
-    end_date = pd.Timestamp.today().date()
-    date_range = pd.date_range(start=start_date, end=end_date, freq='D')
 
-    # create a dictionary to hold the values for each column
 
-    # create a matrix of False values with the same shape as the date range
-    matrix = np.zeros((len(date_range), len(df)), dtype=bool)
-
-    # iterate through the rows in the dataframe and populate the matrix
-    for i, (_, row) in enumerate(df.iterrows()):
-        # get the start and end indices for the row's values in the matrix
-        if row['IsActiveNow'] == 1:
-            start_index = date_range.get_loc(row['StartDate'])
-            end_index = len(date_range) - 1
-        else:
-            start_index = date_range.get_loc(row['StartDate'])
-            end_index = date_range.get_loc(row['EndDate'])
-        # set the corresponding values in the matrix to True
-        matrix[start_index:end_index+1, i] = True
-
-    # create a dataframe using the matrix and the date range as the index
-    new_df = pd.DataFrame(matrix, index=date_range, columns=df['Code'])
-    return new_df
+def presence_matrix(df, freq='D', index=None):
+    return presence.presence_matrix(df, freq=freq, index=index)
 
 def data_from_dict(dico:dict):
-
-    data = pd.DataFrame()
-    for key, value in tqdm(dico.items()):
-        try :
-            df = value
-            df['Ticker'] = key
-            data = pd.concat([df, data], 0)
-        except :
-            ''
-    return data.set_index(['datetime','Ticker'])
+    import utils.panel as panel
+    return panel.build_panel(dico, date_col='datetime', ticker_col='Ticker')
 
 
     
@@ -56,7 +42,7 @@ def aggregate_tickers_classifs(tickers):
     classif = {}
     for ticker in tqdm(tickers) :
         try :
-            classif_ticker = master.equities.get_ticker_classification(ticker,'US')
+            classif_ticker = get_master().equities.get_ticker_classification(ticker,'US')
             classif[ticker] = classif_ticker
         except :
             classif = classif
@@ -67,7 +53,7 @@ def aggregate_tickers_balance_sheet(tickers):
     balance_sheet = {}
     for ticker in tqdm(tickers) :
         try :
-            balance_sheet_ticker = master.equities.get_ticker_balance_sheet(ticker,'US','q')
+            balance_sheet_ticker = get_master().equities.get_ticker_balance_sheet(ticker,'US','q')
             balance_sheet[ticker] = balance_sheet_ticker
         except :
             balance_sheet = balance_sheet
@@ -82,8 +68,8 @@ def aggregate_market_data(tickers:list,period_start :datetime.date):
     mkt_data = {}
     for ticker in tqdm(tickers) :
         try :
-            mkt_data_ticker = master.equities.get_ohlcv(ticker,'US',period_start = period_start)
-            mkt_cap =master.equities.get_ticker_historical_mcap('AAPL','US')
+            mkt_data_ticker = get_master().equities.get_ohlcv(ticker,'US',period_start = period_start)
+            mkt_cap =get_master().equities.get_ticker_historical_mcap(ticker,'US')
             mkt_data_ticker.index = mkt_data_ticker['datetime']
             mkt_data_ticker.index.names =['Date']
             mkt_cap.index.names =['Date']
@@ -101,13 +87,100 @@ def aggregate_market_data(tickers:list,period_start :datetime.date):
 
     return mkt_data
 
+
+async def _asyn_gather_batches(tickers, batch_fn, batch_size, concurrency):
+    """
+    runs batch_fn(batch_tickers) over batches of tickers, at most `concurrency` batches in flight
+    a failing batch is reported for each of its tickers instead of failing the whole universe
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    batches = [list(tickers[i:i + batch_size]) for i in range(0, len(tickers), batch_size)]
+    async def run(batch):
+        async with semaphore:
+            try:
+                return batch, await batch_fn(batch), None
+            except Exception as e:
+                return batch, None, repr(e)
+    return await asyncio.gather(*[run(batch) for batch in batches])
+
+def _failures_report(failures):
+    return pd.DataFrame(failures, columns=['Ticker', 'stage', 'error'])
+
+async def asyn_aggregate_tickers_classifs(tickers, exchange='US', batch_size=200, concurrency=4):
+    async def batch_fn(batch):
+        return await get_master().equities.asyn_batch_get_ticker_generals(tickers=batch, exchanges=[exchange] * len(batch))
+    classif, failures = {}, []
+    for batch, generals, error in await _asyn_gather_batches(tickers, batch_fn, batch_size, concurrency):
+        for i, ticker in enumerate(batch):
+            if error is not None or not generals[i]:
+                failures.append((ticker, 'generals', error or 'no data'))
+                continue
+            classif[ticker] = {
+                "sector": generals[i].get("Sector"),
+                "industry": generals[i].get("Industry"),
+                "gicsect": generals[i].get("GicSector"),
+                "gicgrp": generals[i].get("GicGroup"),
+                "gicind": generals[i].get("GicIndustry"),
+                "gicsubind": generals[i].get("GicSubIndustry")
+            }
+    return pd.DataFrame.from_dict(classif, orient='index'), _failures_report(failures)
+
+async def asyn_aggregate_tickers_balance_sheet(tickers, exchange='US', batch_size=500, concurrency=2):
+    """
+    balance sheets come from the bulk fundamentals endpoint, one call per `batch_size` tickers
+    """
+    async def batch_fn(batch):
+        return await get_master().equities.asyn_batch_get_bulk_fundamentals(exchange=exchange, tickers=batch, limit=batch_size)
+    frames, failures = [], []
+    for batch, bulk, error in await _asyn_gather_batches(tickers, batch_fn, batch_size, concurrency):
+        for ticker in batch:
+            quarterly = ((bulk or {}).get(ticker, {}).get("Financials", {}).get("Balance_Sheet") or {}).get("quarterly")
+            if error is not None or not quarterly:
+                failures.append((ticker, 'balance_sheet', error or 'no data'))
+                continue
+            frame = pd.DataFrame(quarterly).transpose().iloc[::-1]
+            frame.index.name = 'Date'
+            frames.append(frame.assign(Ticker=ticker))
+    if not frames:
+        return pd.DataFrame(), _failures_report(failures)
+    balance_sheet = pd.concat(frames).set_index('Ticker', append=True)
+    return balance_sheet, _failures_report(failures)
+
+async def asyn_aggregate_market_data(tickers, period_start, exchange='US', batch_size=100, concurrency=4):
+    async def batch_fn(batch):
+        exchanges = [exchange] * len(batch)
+        return await asyncio.gather(
+            get_master().equities.asyn_batch_get_ohlcv(tickers=batch, exchanges=exchanges, period_start=period_start),
+            get_master().equities.asyn_batch_get_ticker_historical_mcap(tickers=batch, exchanges=exchanges)
+        )
+    frames, failures = [], []
+    for batch, results, error in await _asyn_gather_batches(tickers, batch_fn, batch_size, concurrency):
+        ohlcvs, mcaps = results if error is None else ([None] * len(batch), [None] * len(batch))
+        for ticker, ohlcv, mcap in zip(batch, ohlcvs, mcaps):
+            if ohlcv is None or len(ohlcv) == 0:
+                failures.append((ticker, 'ohlcv', error or 'no data'))
+                continue
+            frame = ohlcv.set_index(pd.DatetimeIndex(ohlcv['datetime'], name='Date'))
+            if mcap is None or len(mcap) == 0:
+                failures.append((ticker, 'mcap', error or 'no data'))
+                frame = frame.assign(MktCap=np.nan)
+            else:
+                mcap = pd.Series(mcap['value'].astype(float).values, index=pd.DatetimeIndex(pd.to_datetime(mcap.index), name='Date'), name='MktCap')
+                frame = frame.join(mcap[~mcap.index.duplicated()], how='left')
+            frames.append(frame.assign(Ticker=ticker))
+    if not frames:
+        return pd.DataFrame(), _failures_report(failures)
+    mkt_data = pd.concat(frames).set_index('Ticker', append=True)
+    return mkt_data, _failures_report(failures)
+
     
 
 
 def create_rank_column(df:pd.DataFrame,column :str,pct=True, ascending=True,level=0,normalize = False):
+    from scipy.special import ndtri
     column_rank = column+'_rank'
     if normalize:
-        df[column_rank] = df.groupby(level=level)[column].rank(pct=pct,ascending=ascending).clip(0.01,0.99).apply(norm.ppf)
+        df[column_rank] = df.groupby(level=level)[column].rank(pct=pct,ascending=ascending).clip(0.01,0.99).apply(ndtri)
     else :
         df[column_rank] = df.groupby(level=level)[column].rank(pct=pct,ascending=ascending).clip(0.01,0.99)
 
@@ -115,94 +188,125 @@ def create_rank_column(df:pd.DataFrame,column :str,pct=True, ascending=True,leve
 
 
 
-def write_to_parquet(df:pd.DataFrame,directory:str,name :str):
+def write_to_parquet(df:pd.DataFrame,directory:str,name :str,append=False):
+    """
+    (Date, Ticker) frames go to the partitioned store data/directory/name/year=YYYY/bucket=NN/,
+    append=True only adds the new rows' files, other frames are still written to data/directory/name.pq
+    a data/directory/name.pq left from before the store is rewritten from it so that direct readers stay current
+    """
+    import utils.store as store
     path_directory = 'data/'+directory
     path = path_directory +'/'+name +'.pq'
+    if list(df.index.names) == ['Date','Ticker']:
+        partitioned = store.PartitionedStore(directory,name)
+        if append and not partitioned.exists() and os.path.exists(path):
+            partitioned.write(pd.read_parquet(path))
+        if append:
+            partitioned.append(df)
+        else:
+            partitioned.write(df)
+        if os.path.exists(path):
+            legacy = partitioned.read() if append else df
+            legacy.to_parquet(path+'.tmp')
+            os.replace(path+'.tmp',path)
+        return
+
     # Check whether the specified path exists or not
     isExist = os.path.exists(path_directory)
     if not isExist:
         # Create a new directory because it does not exist
         os.makedirs(path_directory)
 
-    if os.path.exists(path):
-        os.remove(path)
-    
-    df.to_parquet(path)
+    df.to_parquet(path+'.tmp')
+    os.replace(path+'.tmp',path)
 
 
     
 
 def average_directional_index(df:pd.DataFrame,lookback,smooth =True):
-    plus_dm = df['high'].groupby(level=1).diff()
-    minus_dm = df['high'].groupby(level=1).diff()
-    plus_dm[plus_dm < 0] = 0
-    minus_dm[minus_dm > 0] = 0
-
-    tr1 = pd.DataFrame(df['high'] - df['low'])
-    tr2 = pd.DataFrame(abs(df['high'] - df['close'].groupby(level=1).shift(1)))
-    tr3 = pd.DataFrame(abs(df['low'] - df['close'].groupby(level=1).shift(1)))
-    frames = [tr1, tr2, tr3]
-    tr = pd.concat(frames, axis = 1, join = 'inner').max(axis = 1)
-    atr = tr.groupby(level=1).rolling(lookback).mean().droplevel(0)
-
-    plus_di = 100 * (plus_dm.groupby(level=1).ewm(alpha = 1/lookback).mean().droplevel(0) / atr)
-    minus_di = abs(100 * (minus_dm.groupby(level=1).ewm(alpha = 1/lookback).mean().droplevel(0) / atr))
-    dx = (abs(plus_di - minus_di) / abs(plus_di + minus_di)) * 100
-    adx = ((dx.groupby(level=1).shift(1) * (lookback - 1)) + dx) / lookback
-    adx_smooth = adx.groupby(level=1).ewm(alpha = 1/lookback).mean().droplevel(0)
-    
-    if smooth:
-        return pd.DataFrame(adx_smooth,columns =['ADX'])
-    else :
-        return pd.DataFrame(adx,columns =['ADX'])
+    import utils.kernels as kernels
+    high, layout = kernels.to_wide(df['high'], compact=True)
+    low, _ = kernels.to_wide(df['low'], compact=True)
+    close, _ = kernels.to_wide(df['close'], compact=True)
+    adx = kernels.adx(high, low, close, lookback, smooth=smooth)
+    return pd.DataFrame(kernels.to_long(adx, layout),columns =['ADX'])
     
 
 def mvwap(df:pd.DataFrame,lookback:int):
-    tp = df[['close','high','low']].mean(1)
-    tpv = tp * df['volume']
-    tpv_cum = tpv.groupby(level=1).rolling(lookback).sum().droplevel(0)
-    mvwap = tpv_cum / df['volume'].groupby(level=1).rolling(lookback).sum().droplevel(0)
-    return pd.DataFrame(mvwap,columns =['MVWAP'])
+    import utils.kernels as kernels
+    close, layout = kernels.to_wide(df['close'], compact=True)
+    high, _ = kernels.to_wide(df['high'], compact=True)
+    low, _ = kernels.to_wide(df['low'], compact=True)
+    volume, _ = kernels.to_wide(df['volume'], compact=True)
+    mvwap = kernels.mvwap(close, high, low, volume, lookback)
+    return pd.DataFrame(kernels.to_long(mvwap, layout),columns =['MVWAP'])
 
 def rsi(df:pd.DataFrame,lookback:int):
-    ret = df['close'].groupby(level=1).pct_change()
-    up = ret
-    up[up<0]= 0
-
-    lookback=5
-    up = up.groupby(level=1).ewm(alpha = 1/lookback).mean().droplevel(0).reindex(ret.index).ffill()
-
-    down = ret
-    down[down>0]=0
-    lookback=5
-    down = down.abs().groupby(level=1).ewm(alpha = 1/lookback).mean().droplevel(0).reindex(ret.index).ffill()
-    rs = up/ down
-    rsi = 100 - (100/(1+rs))
-    rsi = pd.DataFrame(rsi)
-    rsi.columns =['RSI']
-    return rsi
+    import utils.kernels as kernels
+    close, layout = kernels.to_wide(df['close'], compact=True)
+    rsi = kernels.rsi(close, lookback)
+    return pd.DataFrame(kernels.to_long(rsi, layout),columns =['RSI'])
 
 def rank_ts(df:pd.DataFrame,col:str,lookback:int,pct=True,ascending=True,normalize=False):
-    column = df[col].unstack()
+    import utils.kernels as kernels
+    column, layout = kernels.to_wide(df[col])
     if normalize :
-        column_rank =column.rolling(lookback).rank(axis=0,pct=pct,ascending=ascending).clip(0.01,0.99).apply(norm.ppf)
+        column_rank = kernels.rolling_rank(column, lookback, pct=pct, ascending=ascending, normalize=True)
     else :
-        column_rank = column.rolling(lookback).rank(axis=0,pct=pct,ascending=ascending).clip(0.01,0.99)
+        column_rank = np.clip(kernels.rolling_rank(column, lookback, pct=pct, ascending=ascending), 0.01, 0.99)
+    column_rank = kernels.to_frame(column_rank, layout)
     return pd.DataFrame(column_rank.stack(),columns =[col+'_rank'])
 
-def extract_gics(universe:str):
+def extract_gics(universe:str,tickers=None):
     path = 'data/'+universe+'/GICS.pq'
     gics = pd.read_parquet(path)
+    if tickers is not None:
+        gics = gics.loc[gics.index.intersection(tickers)]
     gics = gics.fillna('other')
     return gics
 
 
-def extract_mkt_data(universe:str):
-    path = 'data/'+universe+'/mkt_data.pq'
-    mkt_data = pd.read_parquet(path)
-    mkt_data['ret'] = mkt_data['close'].groupby(level=0).pct_change()
+def extract_mkt_data(universe:str,columns=None,tickers=None,period_start=None,period_end=None):
+    """
+    reads only the requested columns / tickers / dates from the partitioned store (legacy mkt_data.pq otherwise),
+    a few days before period_start are read so that the first ret of the range is not NaN
+    """
+    import utils.store as store
+    read_columns = None if columns is None else list(dict.fromkeys(list(columns)+['close']))
+    read_start = None if period_start is None else pd.Timestamp(period_start) - pd.Timedelta(days=10)
+    partitioned = store.PartitionedStore(universe,'mkt_data')
+    if partitioned.exists():
+        mkt_data = partitioned.read(columns=read_columns,tickers=tickers,period_start=read_start,period_end=period_end)
+    else:
+        path = 'data/'+universe+'/mkt_data.pq'
+        mkt_data = pd.read_parquet(path,columns=read_columns).sort_index()
+        dates = mkt_data.index.get_level_values(0)
+        keep = np.ones(len(mkt_data),dtype=bool)
+        if tickers is not None:
+            keep &= mkt_data.index.get_level_values(1).isin(tickers)
+        if read_start is not None:
+            keep &= dates >= read_start
+        if period_end is not None:
+            keep &= dates <= pd.Timestamp(period_end)
+        mkt_data = mkt_data[keep]
+    mkt_data['ret'] = mkt_data['close'].groupby(level=1).pct_change()
+    if period_start is not None:
+        mkt_data = mkt_data[mkt_data.index.get_level_values(0) >= pd.Timestamp(period_start)]
+    if columns is not None:
+        mkt_data = mkt_data[[c for c in dict.fromkeys(list(columns)+['ret']) if c in mkt_data.columns]]
     return mkt_data
 
+def cache_mkt_data(universe:str,fields=None,dtype=np.float32,dtypes=None):
+    """
+    extract_mkt_data -> memory mapped dates x tickers panels in data/universe/panel_cache
+    """
+    import utils.panel_cache as panel_cache
+    return panel_cache.build_panel_cache(extract_mkt_data(universe),'data/'+universe+'/panel_cache',fields=fields,dtype=dtype,dtypes=dtypes)
+
+def extract_panel_cache(universe:str):
+    import utils.panel_cache as panel_cache
+    return panel_cache.PanelCache('data/'+universe+'/panel_cache')
+
 def center(x):
     mean = x.mean(1)
     x = x.sub(mean,0)
@@ -0,0 +1,325 @@
+import numpy as np
+import pandas as pd
+
+from scipy.special import ndtri
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+"""
+Wide (rows x assets) NaN aware rolling kernels, numba compiled and parallel across columns when numba is installed
+windows, shifts and diffs are counted in rows: with to_wide(compact=True) a row is an asset's n-th observation
+(the groupby(level=1) semantics, missing (Date, Ticker) rows are skipped), by default a row is a date and missing
+(date, asset) cells are NaN rows of the asset's column (the unstack() semantics)
+"""
+
+def _observation_codes(date_codes, ticker_codes, n_tickers):
+    """
+    position of each row among its ticker's rows in date order
+    """
+    order = np.lexsort((date_codes, ticker_codes))
+    counts = np.bincount(ticker_codes, minlength=n_tickers)
+    starts = np.cumsum(counts) - counts
+    observations = np.empty(len(order), dtype=np.int64)
+    observations[order] = np.arange(len(order)) - np.repeat(starts, counts)
+    return observations, (counts.max() if len(counts) else 0)
+
+def to_wide(series, compact=False):
+    """
+    (Date, Ticker) long series -> (rows x tickers array, layout), layout maps the array back with to_long
+    rows are the sorted dates, or with compact=True each ticker's observations packed from the top (NaN padded below)
+    """
+    date_codes, dates = pd.factorize(series.index.get_level_values(0), sort=True)
+    ticker_codes, tickers = pd.factorize(series.index.get_level_values(1), sort=True)
+    if compact:
+        row_codes, n_rows = _observation_codes(date_codes, ticker_codes, len(tickers))
+        dates = None
+    else:
+        row_codes, n_rows = date_codes, len(dates)
+    wide = np.full((n_rows, len(tickers)), np.nan)
+    wide[row_codes, ticker_codes] = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return wide, (series.index, row_codes, ticker_codes, dates, tickers)
+
+def to_long(wide, layout, name=None):
+    index, row_codes, ticker_codes, _, _ = layout
+    return pd.Series(wide[row_codes, ticker_codes], index=index, name=name)
+
+def to_frame(wide, layout):
+    _, _, _, dates, tickers = layout
+    if dates is None:
+        raise ValueError("to_frame needs a dates layout, not a compact one")
+    return pd.DataFrame(wide, index=dates, columns=tickers)
+
+def shift(values, periods=1):
+    shifted = np.full_like(values, np.nan)
+    if periods > 0:
+        shifted[periods:] = values[:-periods]
+    elif periods < 0:
+        shifted[:periods] = values[-periods:]
+    else:
+        shifted[:] = values
+    return shifted
+
+"""
+numpy kernels
+"""
+def _np_rolling_sum(values, window, min_periods):
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    return np.where(counts >= min_periods, sums, np.nan), counts
+
+def _np_ewm_mean(values, alpha, adjust, ignore_na, min_periods):
+    n_rows, n_cols = values.shape
+    out = np.empty((n_rows, n_cols))
+    new_wt = 1.0 if adjust else alpha
+    weighted = values[0].astype(np.float64)
+    old_wt = np.ones(n_cols)
+    nobs = (~np.isnan(weighted)).astype(np.int64)
+    out[0] = np.where(nobs >= min_periods, weighted, np.nan)
+    for i in range(1, n_rows):
+        cur = values[i]
+        is_obs = ~np.isnan(cur)
+        nobs += is_obs
+        started = ~np.isnan(weighted)
+        decay = started & (is_obs | (not ignore_na))
+        old_wt = np.where(decay, old_wt * (1 - alpha), old_wt)
+        update = started & is_obs
+        with np.errstate(invalid="ignore"):
+            blended = np.where(weighted != cur, (old_wt * weighted + new_wt * cur) / (old_wt + new_wt), weighted)
+        weighted = np.where(update, blended, np.where(~started & is_obs, cur, weighted))
+        old_wt = np.where(update, old_wt + new_wt if adjust else 1.0, old_wt)
+        out[i] = np.where(nobs >= min_periods, weighted, np.nan)
+    return out
+
+"""
+numba kernels
+"""
+if numba is not None:
+    @numba.njit(parallel=True, cache=True)
+    def _nb_rolling_sum(values, window, min_periods):
+        n_rows, n_cols = values.shape
+        out = np.empty((n_rows, n_cols))
+        counts = np.empty((n_rows, n_cols), dtype=np.int64)
+        for j in numba.prange(n_cols):
+            total = 0.0
+            compensation = 0.0
+            count = 0
+            for i in range(n_rows):
+                value = values[i, j]
+                if value == value:
+                    y = value - compensation
+                    t = total + y
+                    compensation = (t - total) - y
+                    total = t
+                    count += 1
+                if i >= window:
+                    old = values[i - window, j]
+                    if old == old:
+                        y = -old - compensation
+                        t = total + y
+                        compensation = (t - total) - y
+                        total = t
+                        count -= 1
+                if count == 0:
+                    total = 0.0
+                    compensation = 0.0
+                counts[i, j] = count
+                out[i, j] = total if count >= min_periods else np.nan
+        return out, counts
+
+    @numba.njit(parallel=True, cache=True)
+    def _nb_ewm_mean(values, alpha, adjust, ignore_na, min_periods):
+        n_rows, n_cols = values.shape
+        out = np.empty((n_rows, n_cols))
+        new_wt = 1.0 if adjust else alpha
+        for j in numba.prange(n_cols):
+            weighted = values[0, j]
+            old_wt = 1.0
+            nobs = 1 if weighted == weighted else 0
+            out[0, j] = weighted if nobs >= min_periods else np.nan
+            for i in range(1, n_rows):
+                cur = values[i, j]
+                is_obs = cur == cur
+                if is_obs:
+                    nobs += 1
+                if weighted == weighted:
+                    if is_obs or not ignore_na:
+                        old_wt *= 1 - alpha
+                        if is_obs:
+                            if weighted != cur:
+                                weighted = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+                            if adjust:
+                                old_wt += new_wt
+                            else:
+                                old_wt = 1.0
+                elif is_obs:
+                    weighted = cur
+                out[i, j] = weighted if nobs >= min_periods else np.nan
+        return out
+
+    @numba.njit(cache=True)
+    def _nb_bisect(window_values, size, value, right):
+        lo, hi = 0, size
+        while lo < hi:
+            mid = (lo + hi) >> 1
+            if window_values[mid] < value or (right and window_values[mid] == value):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    @numba.njit(parallel=True, cache=True)
+    def _nb_rolling_rank(columns, window, min_periods, pct):
+        """
+        columns is assets x dates, each asset keeps a sorted buffer of the non NaN values in its window,
+        the value leaving the window is replaced by the one entering it with a single shift between their positions
+        """
+        n_cols, n_rows = columns.shape
+        out = np.empty((n_cols, n_rows))
+        for j in numba.prange(n_cols):
+            values = columns[j]
+            window_values = np.empty(window)
+            size = 0
+            for i in range(n_rows):
+                value = values[i]
+                old = values[i - window] if i >= window else np.nan
+                if old == old and value == value:
+                    removed = _nb_bisect(window_values, size, old, False)
+                    if value > old:
+                        position = _nb_bisect(window_values, size, value, False)
+                        for k in range(removed, position - 1):
+                            window_values[k] = window_values[k + 1]
+                        window_values[position - 1] = value
+                    elif value < old:
+                        position = _nb_bisect(window_values, size, value, False)
+                        for k in range(removed, position, -1):
+                            window_values[k] = window_values[k - 1]
+                        window_values[position] = value
+                elif old == old:
+                    removed = _nb_bisect(window_values, size, old, False)
+                    for k in range(removed, size - 1):
+                        window_values[k] = window_values[k + 1]
+                    size -= 1
+                elif value == value:
+                    position = _nb_bisect(window_values, size, value, False)
+                    for k in range(size, position, -1):
+                        window_values[k] = window_values[k - 1]
+                    window_values[position] = value
+                    size += 1
+                if value != value or size < min_periods:
+                    out[j, i] = np.nan
+                    continue
+                less = _nb_bisect(window_values, size, value, False)
+                less_equal = _nb_bisect(window_values, size, value, True)
+                rank = less + (less_equal - less + 1) / 2
+                out[j, i] = rank / size if pct else rank
+        return out
+
+def _use_numba(use_numba):
+    return numba is not None if use_numba is None else (use_numba and numba is not None)
+
+def rolling_sum(values, window, min_periods=None, use_numba=None):
+    """
+    df.rolling(window, min_periods).sum() column by column
+    """
+    values = np.asarray(values, dtype=np.float64)
+    min_periods = window if min_periods is None else min_periods
+    if _use_numba(use_numba):
+        return _nb_rolling_sum(values, window, min_periods)[0]
+    return _np_rolling_sum(values, window, min_periods)[0]
+
+def rolling_mean(values, window, min_periods=None, use_numba=None):
+    values = np.asarray(values, dtype=np.float64)
+    min_periods = window if min_periods is None else min_periods
+    if _use_numba(use_numba):
+        sums, counts = _nb_rolling_sum(values, window, min_periods)
+    else:
+        sums, counts = _np_rolling_sum(values, window, min_periods)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+def ewm_mean(values, alpha, adjust=True, ignore_na=False, min_periods=0, use_numba=None):
+    """
+    df.ewm(alpha=alpha, adjust=adjust, ignore_na=ignore_na, min_periods=min_periods).mean() column by column
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return values.copy()
+    min_periods = max(min_periods, 1)
+    if _use_numba(use_numba):
+        return _nb_ewm_mean(values, alpha, adjust, ignore_na, min_periods)
+    return _np_ewm_mean(values, alpha, adjust, ignore_na, min_periods)
+
+def _np_rolling_rank(values, window, min_periods, pct):
+    n_rows, n_cols = values.shape
+    out = np.full((n_rows, n_cols), np.nan)
+    for i in range(n_rows):
+        block = values[max(0, i - window + 1):i + 1]
+        last = block[-1]
+        count = (~np.isnan(block)).sum(axis=0)
+        less = (block < last).sum(axis=0)
+        equal = (block == last).sum(axis=0)
+        rank = less + (equal + 1) / 2
+        ok = ~np.isnan(last) & (count >= min_periods)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[i] = np.where(ok, rank / count if pct else rank, np.nan)
+    return out
+
+def rolling_rank(values, window, pct=True, ascending=True, min_periods=None, normalize=False, use_numba=None):
+    """
+    df.rolling(window).rank(pct=pct, ascending=ascending) with average ties, rank of the last value in every window
+    normalize clips to [0.01, 0.99] and applies norm.ppf as rank_ts does
+    incremental sorted window per column with numba (parallel across columns), a numpy scan when numba is missing
+    """
+    values = np.asarray(values, dtype=np.float64)
+    min_periods = window if min_periods is None else max(min_periods, 1)
+    values = values if ascending else -values
+    if _use_numba(use_numba):
+        ranks = _nb_rolling_rank(np.ascontiguousarray(values.T), window, min_periods, pct).T
+    else:
+        ranks = _np_rolling_rank(values, window, min_periods, pct)
+    if normalize:
+        return ndtri(np.clip(ranks, 0.01, 0.99))
+    return ranks
+
+"""
+Indicators, wide inputs
+"""
+def adx(high, low, close, lookback, smooth=True, use_numba=None):
+    plus_dm = high - shift(high)
+    minus_dm = low - shift(low)
+    plus_dm[plus_dm < 0] = 0
+    minus_dm[minus_dm > 0] = 0
+
+    prev_close = shift(close)
+    tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    atr = rolling_mean(tr, lookback, use_numba=use_numba)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        plus_di = 100 * (ewm_mean(plus_dm, 1 / lookback, use_numba=use_numba) / atr)
+        minus_di = np.abs(100 * (ewm_mean(minus_dm, 1 / lookback, use_numba=use_numba) / atr))
+        dx = (np.abs(plus_di - minus_di) / np.abs(plus_di + minus_di)) * 100
+    adx = ((shift(dx) * (lookback - 1)) + dx) / lookback
+    return ewm_mean(adx, 1 / lookback, use_numba=use_numba) if smooth else adx
+
+def mvwap(close, high, low, volume, lookback, use_numba=None):
+    prices = np.stack([close, high, low])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        tp = np.nansum(prices, axis=0) / (~np.isnan(prices)).sum(axis=0)
+        return rolling_sum(tp * volume, lookback, use_numba=use_numba) / rolling_sum(volume, lookback, use_numba=use_numba)
+
+def rsi(close, lookback, use_numba=None):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ret = close / shift(close) - 1
+    up = np.where(ret < 0, 0, ret)
+    down = np.abs(np.where(ret > 0, 0, ret))
+    up = ewm_mean(up, 1 / lookback, use_numba=use_numba)
+    down = ewm_mean(down, 1 / lookback, use_numba=use_numba)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rs = up / down
+        return 100 - (100 / (1 + rs))
@@ -0,0 +1,116 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
+
+def _iter_frames(frames):
+    items = frames.items() if isinstance(frames, dict) else frames
+    for ticker, df in items:
+        if isinstance(df, pd.DataFrame) and not df.empty:
+            yield ticker, df
+
+def _column_dtype(dtypes, column):
+    if isinstance(dtypes, dict):
+        return dtypes.get(column)
+    return dtypes
+
+def _missing_dtype(dtype):
+    # NaN has no integer / bool representation, a column missing from some frame is upcast to float64
+    if dtype is None or np.dtype(dtype).kind in "iub":
+        return np.float64
+    return dtype
+
+def build_panel(frames, date_col="datetime", ticker_col="Ticker", columns=None, dtypes=None):
+    """
+    (date_col, ticker_col) indexed panel from {ticker: df} or an iterable of (ticker, df), df has date_col as a column or index
+    every column is concatenated once from the frames' arrays, the input frames are left untouched
+    columns missing from a frame are NaN, dtypes (one dtype or {column: dtype}) fixes the output dtypes,
+    integer and bool columns missing from a frame come out as float64
+    """
+    tickers, lengths, dates, blocks = [], [], [], []
+    seen = {} if columns is None else None
+    for ticker, df in _iter_frames(frames):
+        if date_col not in df.columns and df.index.name == date_col:
+            df = df.reset_index()
+        tickers.append(ticker)
+        lengths.append(len(df))
+        date_values = df[date_col]
+        if not pd.api.types.is_datetime64_any_dtype(date_values):
+            date_values = pd.to_datetime(date_values, cache=False)
+        dates.append(date_values.to_numpy(dtype="datetime64[ns]"))
+        blocks.append(df)
+        if seen is not None:
+            seen.update({column: None for column in df.columns if column not in (date_col, ticker_col)})
+    columns = list(seen) if seen is not None else list(columns)
+
+    if not blocks:
+        index = pd.MultiIndex.from_arrays([pd.DatetimeIndex([]), pd.Index([], dtype=object)], names=[date_col, ticker_col])
+        return pd.DataFrame({column: pd.Series([], dtype=_column_dtype(dtypes, column) or np.float64) for column in columns}, index=index)
+
+    data = {}
+    for column in columns:
+        dtype = _column_dtype(dtypes, column)
+        arrays = []
+        for df in blocks:
+            if column in df.columns:
+                arrays.append(df[column].to_numpy(dtype=dtype) if dtype is not None else df[column].to_numpy())
+            else:
+                arrays.append(np.full(len(df), np.nan, dtype=_missing_dtype(dtype)))
+        data[column] = np.concatenate(arrays)
+
+    index = pd.MultiIndex.from_arrays(
+        [pd.DatetimeIndex(np.concatenate(dates)), np.repeat(np.asarray(tickers, dtype=object), lengths)],
+        names=[date_col, ticker_col]
+    )
+    return pd.DataFrame(data, index=index, copy=False)
+
+def _chunks(frames, chunksize):
+    chunk = []
+    for item in _iter_frames(frames):
+        chunk.append(item)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def write_panel_partitions(frames, directory, chunksize=200, date_col="datetime", ticker_col="Ticker", columns=None, dtypes=None):
+    """
+    streaming build_panel, every `chunksize` tickers are assembled and spilled to directory/part-xxxxx.pq
+    so the full panel never sits in memory, the schema of the first chunk is enforced on the following ones
+    (NaN in a column the first chunk had as integer / bool is written as null)
+    returns the list of written files
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    schema = None
+    for i, chunk in enumerate(_chunks(frames, chunksize)):
+        df = build_panel(chunk, date_col=date_col, ticker_col=ticker_col, columns=columns, dtypes=dtypes)
+        if schema is None:
+            columns = list(df.columns)
+            dtypes = {column: dtype for column, dtype in df.dtypes.items()}
+        table = pa.Table.from_pandas(df.reset_index(), schema=schema, preserve_index=False)
+        if schema is None:
+            schema = table.schema
+        path = os.path.join(directory, "part-{:05d}.pq".format(i))
+        pq.write_table(table, path)
+        paths.append(path)
+    return paths
+
+def read_panel(directory, columns=None, tickers=None, period_start=None, period_end=None, date_col="datetime", ticker_col="Ticker"):
+    dataset = ds.dataset(directory, format="parquet")
+    filters = []
+    if tickers is not None:
+        filters.append(ds.field(ticker_col).isin(list(tickers)))
+    if period_start is not None:
+        filters.append(ds.field(date_col) >= pd.Timestamp(period_start))
+    if period_end is not None:
+        filters.append(ds.field(date_col) <= pd.Timestamp(period_end))
+    expression = None
+    for f in filters:
+        expression = f if expression is None else expression & f
+    read_columns = None if columns is None else [date_col, ticker_col] + [c for c in columns if c not in (date_col, ticker_col)]
+    df = dataset.to_table(columns=read_columns, filter=expression).to_pandas()
+    return df.set_index([date_col, ticker_col])
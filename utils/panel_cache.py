@@ -0,0 +1,89 @@
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+
+"""
+On disk dates x tickers panels, one .npy per field plus the shared dates.npy / tickers.npy axes
+fields are opened with np.load(mmap_mode='r'), every process mapping the same directory shares the page cache
+"""
+
+def build_panel_cache(mkt_data, directory, fields=None, dtype=np.float32, dtypes=None):
+    """
+    long (Date, Ticker) frame (extract_mkt_data output) -> directory/{dates,tickers,<field>}.npy
+    each field is scattered straight into its own memmap, the wide frames are never held in memory
+    dtypes overrides dtype per field, e.g. {"volume": np.float64}
+    the cache is written next to directory and swapped in once complete
+    """
+    fields = [c for c in mkt_data.columns if pd.api.types.is_numeric_dtype(mkt_data[c])] if fields is None else list(fields)
+    dtypes = {} if dtypes is None else dtypes
+    date_codes, dates = pd.factorize(mkt_data.index.get_level_values(0), sort=True)
+    ticker_codes, tickers = pd.factorize(mkt_data.index.get_level_values(1), sort=True)
+    shape = (len(dates), len(tickers))
+
+    building = directory.rstrip("/") + ".building"
+    if os.path.isdir(building):
+        shutil.rmtree(building)
+    os.makedirs(building)
+    np.save(os.path.join(building, "dates.npy"), pd.DatetimeIndex(dates).to_numpy(dtype="datetime64[ns]"))
+    np.save(os.path.join(building, "tickers.npy"), np.asarray(tickers, dtype=str))
+    for field in fields:
+        field_dtype = np.dtype(dtypes.get(field, dtype))
+        out = np.lib.format.open_memmap(os.path.join(building, field + ".npy"), mode="w+", dtype=field_dtype, shape=shape)
+        out[...] = np.nan
+        out[date_codes, ticker_codes] = mkt_data[field].to_numpy(dtype=field_dtype, na_value=np.nan)
+        out.flush()
+        del out
+    with open(os.path.join(building, "fields.json"), "w") as f:
+        json.dump(fields, f)
+
+    if os.path.isdir(directory):
+        shutil.rmtree(directory)
+    os.replace(building, directory)
+    return PanelCache(directory)
+
+class PanelCache():
+    """
+    read only view on a build_panel_cache directory, fields are mapped on first access
+    cache["close"] is the memmap, cache.frame("close") wraps it in a DataFrame without copying
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.dates = pd.DatetimeIndex(np.load(os.path.join(directory, "dates.npy")), name="Date")
+        self.tickers = pd.Index(np.load(os.path.join(directory, "tickers.npy")).astype(object), name="Ticker")
+        with open(os.path.join(directory, "fields.json")) as f:
+            self.fields = json.load(f)
+        self._arrays = {}
+
+    def __contains__(self, field):
+        return field in self.fields
+
+    def __getitem__(self, field):
+        if field not in self.fields:
+            raise KeyError(field)
+        if field not in self._arrays:
+            self._arrays[field] = np.load(os.path.join(self.directory, field + ".npy"), mmap_mode="r")
+        return self._arrays[field]
+
+    @property
+    def shape(self):
+        return (len(self.dates), len(self.tickers))
+
+    def frame(self, field):
+        return pd.DataFrame(self[field], index=self.dates, columns=self.tickers, copy=False)
+
+    def window(self, field, tickers=None, period_start=None, period_end=None):
+        """
+        date range slice of the memmap (still a view), tickers select columns (a copy of only those columns)
+        """
+        start = 0 if period_start is None else self.dates.searchsorted(pd.Timestamp(period_start), side="left")
+        end = len(self.dates) if period_end is None else self.dates.searchsorted(pd.Timestamp(period_end), side="right")
+        values = self[field][start:end]
+        columns = self.tickers
+        if tickers is not None:
+            positions = self.tickers.get_indexer(tickers)
+            positions = positions[positions >= 0]
+            values = values[:, positions]
+            columns = self.tickers[positions]
+        return pd.DataFrame(values, index=self.dates[start:end], columns=columns, copy=False)
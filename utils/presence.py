@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+OPEN_END = np.datetime64(pd.Timestamp.max, "ns")
+
+def presence_index(universe, freq="D", end_date=None):
+    """
+    date index of the presence matrix, from the earliest StartDate to end_date (today by default)
+    freq is any pandas frequency, "D" calendar days, "B" business days, or a CustomBusinessDay for an exchange calendar
+    """
+    start_date = pd.to_datetime(universe['StartDate']).min()
+    end_date = pd.Timestamp.today().normalize() if end_date is None else pd.Timestamp(end_date)
+    return pd.date_range(start=start_date, end=end_date, freq=freq)
+
+class PresenceIntervals():
+    """
+    compact membership, one [start_date, end_date] interval per universe row, end_date is open for active rows
+    columns are the unique codes, a code listed several times (re-entries) owns several intervals
+    the dense mask is only built on demand, on the default index or on any other dates/tickers
+    """
+    def __init__(self, index, columns, codes, start_dates, end_dates):
+        self.index = index
+        self.columns = columns
+        self.codes = codes
+        self.start_dates = start_dates
+        self.end_dates = end_dates
+
+    @classmethod
+    def from_universe(cls, universe, index=None, freq="D", end_date=None):
+        index = presence_index(universe, freq=freq, end_date=end_date) if index is None else pd.DatetimeIndex(index)
+        columns = pd.Index(pd.unique(universe['Code']))
+        end_dates = pd.to_datetime(universe['EndDate']).to_numpy(dtype="datetime64[ns]")
+        active = (universe['IsActiveNow'].to_numpy() == 1) | np.isnat(end_dates)
+        return cls(
+            index=index,
+            columns=columns,
+            codes=columns.get_indexer(universe['Code']),
+            start_dates=pd.to_datetime(universe['StartDate']).to_numpy(dtype="datetime64[ns]"),
+            end_dates=np.where(active, OPEN_END, end_dates)
+        )
+
+    def positions(self, index=None):
+        """
+        [start, end) row positions of every interval on index
+        """
+        index_values = pd.DatetimeIndex(self.index if index is None else index).to_numpy(dtype="datetime64[ns]")
+        return np.searchsorted(index_values, self.start_dates, side="left"), np.searchsorted(index_values, self.end_dates, side="right")
+
+    def to_numpy(self, index=None, columns=None):
+        """
+        dense (dates, tickers) bool mask, filled ticker-major so every interval is one contiguous slice assignment
+        """
+        index = self.index if index is None else pd.DatetimeIndex(index)
+        columns = self.columns if columns is None else pd.Index(columns)
+        starts, ends = self.positions(index)
+        codes = columns.get_indexer(self.columns[self.codes])
+        keep = np.flatnonzero((codes >= 0) & (ends > starts))
+        mask = np.zeros((len(columns), len(index)), dtype=bool)
+        for code, start, end in zip(codes[keep].tolist(), starts[keep].tolist(), ends[keep].tolist()):
+            mask[code, start:end] = True
+        return mask.T
+
+    def to_frame(self, index=None, columns=None):
+        index = self.index if index is None else pd.DatetimeIndex(index)
+        columns = self.columns if columns is None else pd.Index(columns)
+        return pd.DataFrame(self.to_numpy(index=index, columns=columns), index=index, columns=columns)
+
+    def reindex_like(self, df):
+        """
+        mask on df's own dates and tickers, usable as SIGNAL[P.reindex_like(SIGNAL)]
+        """
+        return self.to_frame(index=df.index, columns=df.columns)
+
+    def packbits(self):
+        """
+        dense mask on the default index packed 8 dates per byte, unpackbits restores the [P] frame
+        """
+        return np.packbits(self.to_numpy(), axis=0)
+
+    def unpackbits(self, packed):
+        return pd.DataFrame(np.unpackbits(packed, axis=0, count=len(self.index)).astype(bool), index=self.index, columns=self.columns)
+
+def presence_matrix(universe, freq="D", index=None, end_date=None):
+    return PresenceIntervals.from_universe(universe, index=index, freq=freq, end_date=end_date).to_frame()
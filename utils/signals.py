@@ -0,0 +1,93 @@
+import time
+import numpy as np
+import pandas as pd
+
+from scipy.special import ndtri
+
+def presence_mask(P, df):
+    if P is None:
+        return None
+    mask = P.reindex_like(df)
+    return np.asarray(mask.to_numpy(na_value=False), dtype=bool)
+
+def cross_sectional_rank(values, ascending=True):
+    """
+    row-wise pct rank with average ties, NaN stays NaN: df.rank(1, pct=True, ascending=ascending) as in the notebooks
+    and func.create_rank_column, pandas' cython rank beats an argsort based numpy rank on R1K-shaped panels
+    """
+    values = np.asarray(values, dtype=np.float64)
+    ranks = pd.DataFrame(values, copy=False).rank(axis=1, pct=True, ascending=ascending)
+    return ranks.to_numpy(dtype=np.float64)
+
+def gaussianize(ranks, lower=0.01, upper=0.99):
+    return ndtri(np.clip(ranks, lower, upper))
+
+def apply_threshold(values, thresh):
+    return np.where(np.abs(values) < thresh, np.nan, values)
+
+def group_codes(groups, df, return_labels=False):
+    """
+    integer group ids aligned to df, -1 where the asset has no group
+    groups is a static {asset: group} Series or a time varying dates x assets frame (e.g. GICS in the notebooks)
+    """
+    if isinstance(groups, pd.DataFrame):
+        labels = groups.reindex_like(df)
+        codes, uniques = pd.factorize(labels.to_numpy().ravel())
+        codes = codes.reshape(labels.shape)
+    else:
+        codes, uniques = pd.factorize(pd.Series(groups).reindex(df.columns))
+    return (codes, uniques) if return_labels else codes
+
+def group_demean(values, codes):
+    """
+    subtract the nan-mean of each (date, group), the vectorized form of groupby(GICS, axis=1).apply(center)
+    assets with code -1 are left NaN, as groupby drops them
+    """
+    n_rows, n_cols = values.shape
+    codes = np.broadcast_to(codes, (n_rows, n_cols))
+    n_groups = int(codes.max()) + 1 if codes.size else 0
+    if n_groups <= 0:
+        return np.full((n_rows, n_cols), np.nan)
+    grouped = codes >= 0
+    valid = ~np.isnan(values) & grouped
+    keys = np.arange(n_rows)[:, None] * n_groups + np.where(grouped, codes, 0)
+    sums = np.bincount(keys[valid], weights=values[valid], minlength=n_rows * n_groups)
+    counts = np.bincount(keys[valid], minlength=n_rows * n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    demeaned = values - means[keys]
+    demeaned[~grouped] = np.nan
+    return demeaned
+
+def l1_normalize(values):
+    gross = np.nansum(np.abs(values), axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return values / gross
+
+def build_signal(df, P=None, groups=None, thresh=0.25, ascending=True, lower=0.01, upper=0.99, timings=None):
+    """
+    SIGNAL = df[P].rank(1, pct=True).clip(lower, upper).apply(norm.ppf)
+    SIGNAL[SIGNAL.abs() < thresh] = None
+    SIGNAL = SIGNAL.groupby(groups, axis=1).apply(center)   # skipped when groups is None
+    SIGNAL = SIGNAL.div(SIGNAL.abs().sum(1), 0)
+    on a dates x assets array, timings (dict) receives the seconds spent in every step
+    """
+    timings = {} if timings is None else timings
+    def timed(name, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings[name] = timings.get(name, 0) + time.perf_counter() - start
+        return result
+
+    values = df.to_numpy(dtype=np.float64, na_value=np.nan)
+    mask = timed("mask", presence_mask, P, df)
+    if mask is not None:
+        values = np.where(mask, values, np.nan)
+    values = timed("rank", cross_sectional_rank, values, ascending)
+    values = timed("ppf", gaussianize, values, lower, upper)
+    values = timed("threshold", apply_threshold, values, thresh)
+    if groups is not None:
+        codes = timed("group_codes", group_codes, groups, df)
+        values = timed("demean", group_demean, values, codes)
+    values = timed("normalize", l1_normalize, values)
+    return pd.DataFrame(values, index=df.index, columns=df.columns)
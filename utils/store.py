@@ -0,0 +1,113 @@
+import os
+import time
+import zlib
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+class PartitionedStore():
+    """
+    (Date, Ticker) long frames stored under root/universe/name/year=YYYY/bucket=NN/part-*.parquet (hive layout)
+    bucket is crc32(ticker) % n_buckets, so a ticker always lands in the same bucket across processes
+    append() only adds files, rows written later win over earlier ones for the same (Date, Ticker) on read
+    read() prunes year/bucket directories from the date range and tickers before scanning row groups
+    """
+    WRITTEN_COL = "_written"
+
+    def __init__(self, universe, name, root="data", n_buckets=16, date_col="Date", ticker_col="Ticker"):
+        self.path = os.path.join(root, universe, name)
+        self.n_buckets = n_buckets
+        self.date_col = date_col
+        self.ticker_col = ticker_col
+
+    def exists(self):
+        return os.path.isdir(self.path) and any(True for _ in os.scandir(self.path))
+
+    def bucket(self, tickers):
+        return np.array([zlib.crc32(str(ticker).encode()) % self.n_buckets for ticker in tickers], dtype=np.int32)
+
+    def _to_table(self, df):
+        df = df.reset_index()
+        dates = pd.to_datetime(df[self.date_col])
+        tickers = df[self.ticker_col]
+        uniques, codes = np.unique(tickers.astype(str).to_numpy(), return_inverse=True)
+        df = df.assign(**{
+            self.date_col: dates,
+            "year": dates.dt.year.astype(np.int32),
+            "bucket": self.bucket(uniques)[codes],
+            PartitionedStore.WRITTEN_COL: np.int64(time.time_ns()),
+        })
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+    def append(self, df):
+        if df is None or len(df) == 0:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        ds.write_dataset(
+            self._to_table(df),
+            self.path,
+            format="parquet",
+            partitioning=ds.partitioning(pa.schema([("year", pa.int32()), ("bucket", pa.int32())]), flavor="hive"),
+            basename_template="part-{}-{{i}}.parquet".format(time.time_ns()),
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+    def write(self, df):
+        """
+        replaces the whole store, write_to_parquet semantics
+        """
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        self.append(df)
+
+    def _dataset(self):
+        return ds.dataset(self.path, format="parquet", partitioning="hive")
+
+    def read(self, columns=None, tickers=None, period_start=None, period_end=None, dedupe=True):
+        if not self.exists():
+            return None
+        dataset = self._dataset()
+        expression = None
+        def conjunction(f):
+            return f if expression is None else expression & f
+        if tickers is not None:
+            tickers = list(tickers)
+            expression = conjunction(ds.field("bucket").isin(np.unique(self.bucket(tickers)).tolist()))
+            expression = conjunction(ds.field(self.ticker_col).isin(tickers))
+        if period_start is not None:
+            period_start = pd.Timestamp(period_start)
+            expression = conjunction(ds.field("year") >= period_start.year)
+            expression = conjunction(ds.field(self.date_col) >= period_start)
+        if period_end is not None:
+            period_end = pd.Timestamp(period_end)
+            expression = conjunction(ds.field("year") <= period_end.year)
+            expression = conjunction(ds.field(self.date_col) <= period_end)
+
+        # superseded rows can only exist where append() left several part files in one partition
+        if dedupe:
+            partitions = [os.path.dirname(fragment.path) for fragment in dataset.get_fragments(filter=expression)]
+            dedupe = len(partitions) != len(set(partitions))
+        read_columns = None
+        if columns is not None:
+            read_columns = [self.date_col, self.ticker_col, PartitionedStore.WRITTEN_COL] + [c for c in columns if c not in (self.date_col, self.ticker_col)]
+        df = dataset.to_table(columns=read_columns, filter=expression).to_pandas()
+        if dedupe and len(df):
+            df = df.sort_values(PartitionedStore.WRITTEN_COL, kind="stable").drop_duplicates([self.date_col, self.ticker_col], keep="last")
+        df = df.drop(columns=[c for c in ["year", "bucket", PartitionedStore.WRITTEN_COL] if c in df.columns])
+        return df.set_index([self.date_col, self.ticker_col]).sort_index()
+
+    def last_date(self, tickers=None):
+        df = self.read(columns=[], tickers=tickers, dedupe=False)
+        if df is None or len(df) == 0:
+            return None
+        return df.index.get_level_values(0).max()
+
+    def compact(self):
+        """
+        rewrites the store with one file per partition and no superseded rows
+        """
+        df = self.read()
+        if df is not None:
+            self.write(df)
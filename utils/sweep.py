@@ -0,0 +1,112 @@
+import multiprocessing as mp
+import concurrent.futures
+import numpy as np
+import pandas as pd
+
+from multiprocessing import shared_memory
+
+import utils.signals as signals
+import utils.backtest as backtest
+
+_attached = {}
+
+def _to_shared(array):
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, {"name": shm.name, "shape": array.shape, "dtype": array.dtype.str}
+
+def _from_shared(spec):
+    """
+    worker side view on a parent owned panel, attached once per process
+    """
+    if spec["name"] not in _attached:
+        _attached[spec["name"]] = shared_memory.SharedMemory(name=spec["name"])
+    return np.ndarray(spec["shape"], dtype=np.dtype(spec["dtype"]), buffer=_attached[spec["name"]].buf)
+
+def _evaluate(gaussian, returns, codes, thresh, cost_bps, lag_days, periods_per_year):
+    values = signals.apply_threshold(gaussian, thresh)
+    if codes is not None:
+        values = signals.group_demean(values, codes)
+    weights = signals.l1_normalize(values)
+    dtype = returns.dtype
+    result = backtest.backtest(
+        pd.DataFrame(weights.astype(dtype, copy=False)), pd.DataFrame(returns),
+        cost_bps=cost_bps, lag=lag_days, periods_per_year=periods_per_year
+    )
+    return result["stats"]
+
+def _run_point(task):
+    gaussian = _from_shared(task["gaussian"])
+    returns = _from_shared(task["returns"])
+    codes = _from_shared(task["codes"]) if task["codes"] is not None else None
+    stats = _evaluate(gaussian, returns, codes, task["thresh"], task["cost_bps"], task["lag_days"], task["periods_per_year"])
+    return {"lag": task["lag"], "threshold": task["thresh"], **stats.to_dict()}
+
+def run_sweep(build_alpha, lags, thresholds, returns, P=None, groups=None, ascending=True,
+              cost_bps=0.0, lag_days=1, periods_per_year=252, max_workers=None, dtype=np.float32):
+    """
+    lag x threshold grid of the build_signal + backtest recipe (test.ipynb)
+    build_alpha(lag) -> dates x assets frame is called once per lag in the parent, masked/ranked/ppf'ed once,
+    the grid points then only threshold, demean, normalize and backtest, in a process pool reading the
+    ranked panels, returns and group codes from shared memory, max_workers=0 runs inline
+    returns a tidy frame, one row per (lag, threshold) with sharpe, turnover, drawdown... columns
+    """
+    returns_df = returns
+    codes = None
+    shms = []
+    try:
+        gaussians = {}
+        for lag in lags:
+            alpha = build_alpha(lag).reindex_like(returns_df)
+            values = alpha.to_numpy(dtype=np.float64, na_value=np.nan)
+            mask = signals.presence_mask(P, alpha)
+            if mask is not None:
+                values = np.where(mask, values, np.nan)
+            gaussians[lag] = signals.gaussianize(signals.cross_sectional_rank(values, ascending)).astype(dtype)
+        returns_values = returns_df.to_numpy(dtype=dtype, na_value=np.nan)
+        if groups is not None:
+            codes = signals.group_codes(groups, returns_df)
+
+        if max_workers == 0:
+            rows = []
+            for lag in lags:
+                for thresh in thresholds:
+                    stats = _evaluate(gaussians[lag], returns_values, codes, thresh, cost_bps, lag_days, periods_per_year)
+                    rows.append({"lag": lag, "threshold": thresh, **stats.to_dict()})
+            return pd.DataFrame(rows)
+
+        shared = {}
+        for key, array in [("returns", returns_values), ("codes", codes)] + [(("gaussian", lag), gaussians[lag]) for lag in lags]:
+            if array is None:
+                shared[key] = None
+                continue
+            shm, spec = _to_shared(array)
+            shms.append(shm)
+            shared[key] = spec
+        gaussians.clear()
+
+        tasks = [{
+            "lag": lag,
+            "thresh": thresh,
+            "gaussian": shared[("gaussian", lag)],
+            "returns": shared["returns"],
+            "codes": shared["codes"],
+            "cost_bps": cost_bps,
+            "lag_days": lag_days,
+            "periods_per_year": periods_per_year
+        } for lag in lags for thresh in thresholds]
+        max_workers = max_workers if max_workers else mp.cpu_count()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+            rows = list(executor.map(_run_point, tasks, chunksize=max(1, len(tasks) // (4 * max_workers))))
+        return pd.DataFrame(rows)
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+def sweep_grid(results, value="sharpe"):
+    """
+    lag x threshold table of one statistic, the shape of test.ipynb's result frame
+    """
+    return results.pivot(index="lag", columns="threshold", values=value)
@@ -1,21 +1,90 @@
-import aiohttp
+import random
 import asyncio
+import aiohttp
 import urllib
 import urllib.parse
+import email.utils
+import datetime
 import db_logs
 
-async def async_aiohttp_get_all(urls, fmt="json"):
-    async with aiohttp.ClientSession() as session:
-        async def fetch(url, tries=0):
-            async with session.get(url) as response:
-                db_logs.DBLogs().debug("try {} {}".format(url, tries))
-                try:
-                    if fmt == "json":
-                        return await response.json()
-                except Exception:
-                    if tries <= 5:
-                        return await fetch(url, tries+1)
+import wrappers.http_client as http_client
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def backoff(tries, base=0.5, cap=30):
+    return random.uniform(0, min(cap, base * 2 ** tries))
+
+def _retry_after(response):
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+async def _fetch(client, url, fmt="json", retries=5, timeout=30):
+    for tries in range(retries + 1):
+        wait = None
+        try:
+            async with client.asyn_get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                db_logs.DBLogs().debug("try {} {} {}".format(url, tries, response.status))
+                if response.status == 200:
+                    return await response.json() if fmt == "json" else await response.text()
+                if response.status not in RETRY_STATUSES:
+                    db_logs.DBLogs().error("http {} not retried {}".format(response.status, url))
                     return None
-        return await asyncio.gather(*[
-            fetch(url) for url in urls
-        ])
\ No newline at end of file
+                if response.status == 429:
+                    wait = _retry_after(response)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            db_logs.DBLogs().warning("try {} {} failed {}".format(url, tries, repr(e)))
+        if tries < retries:
+            await asyncio.sleep(wait if wait is not None else backoff(tries))
+    db_logs.DBLogs().error("giving up {} after {} tries".format(url, retries + 1))
+    return None
+
+async def _fetch_indexed(client, i, url, fmt, retries, timeout):
+    return i, url, await _fetch(client, url, fmt=fmt, retries=retries, timeout=timeout)
+
+async def _stream_indexed(urls, fmt="json", max_in_flight=50, retries=5, timeout=30):
+    client = http_client.HttpClient()
+    url_iter = enumerate(urls)
+    pending = set()
+    def schedule():
+        while len(pending) < max_in_flight:
+            nxt = next(url_iter, None)
+            if nxt is None:
+                return
+            pending.add(asyncio.ensure_future(_fetch_indexed(client, nxt[0], nxt[1], fmt, retries, timeout)))
+    try:
+        schedule()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                yield task.result()
+            schedule()
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def async_aiohttp_stream(urls, fmt="json", max_in_flight=50, retries=5, timeout=30):
+    """
+    yields (url, result) in completion order with at most max_in_flight requests outstanding
+    urls can be any iterable, it is consumed as the window frees up
+    429/5xx/timeouts/decode errors are retried with jittered exponential backoff (Retry-After is honoured on 429),
+    other statuses and exhausted retries give a None result
+    """
+    async for i, url, result in _stream_indexed(urls, fmt=fmt, max_in_flight=max_in_flight, retries=retries, timeout=timeout):
+        yield url, result
+
+async def async_aiohttp_get_all(urls, fmt="json", max_in_flight=50, retries=5, timeout=30):
+    results = [None for _ in range(len(urls))]
+    async for i, url, result in _stream_indexed(urls, fmt=fmt, max_in_flight=max_in_flight, retries=retries, timeout=timeout):
+        results[i] = result
+    return results
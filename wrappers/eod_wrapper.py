@@ -1,7 +1,5 @@
 import os
 import json
-import aiohttp
-import requests
 import datetime
 import calendar
 import numpy as np
@@ -11,10 +9,20 @@ import urllib.parse
 
 from dateutil.relativedelta import relativedelta
 
+import db_logs
 import wrappers.aiohttp_wrapper as aiohttp_wrapper
+import wrappers.http_client as http_client
 
-def get_fundamental_data(eod_client, ticker, exchange="US"):
-    return eod_client.get_fundamental_equity("{}.{}".format(ticker, exchange))
+def get_fundamental_data(eod_client, ticker, exchange="US", filter_=None):
+    url = "https://eodhistoricaldata.com/api/fundamentals/{}.{}".format(ticker, exchange)
+    params = {"api_token": os.getenv('EOD_KEY'), "fmt": "json"}
+    if filter_:
+        params["filter"] = filter_
+    resp = http_client.HttpClient().get(url, params=params)
+    if resp.status_code != 200:
+        db_logs.DBLogs().error("http {} get_fundamental_data {}.{}".format(resp.status_code, ticker, exchange))
+    resp.raise_for_status()
+    return resp.json()
        
 def get_ohlcv(ticker="", exchange="US", period_end=datetime.datetime.today(), period_start=None, period_days=3650):
     url = "https://eodhistoricaldata.com/api/eod/{}.{}".format(ticker, exchange)
@@ -24,7 +32,7 @@ def get_ohlcv(ticker="", exchange="US", period_end=datetime.datetime.today(), pe
         "from": period_start.strftime('%Y-%m-%d') if period_start else (period_end - datetime.timedelta(days=period_days)).strftime('%Y-%m-%d'),
         "to": period_end.strftime('%Y-%m-%d')
     }
-    resp = requests.get(url, params=params)
+    resp = http_client.HttpClient().get(url, params=params)
     df = pd.DataFrame(resp.json())
     df.rename(columns={"date": "datetime", "adjusted_close": "adj_close"}, inplace=True)
     if len(df) > 0:
@@ -39,24 +47,24 @@ async def asyn_get_ohlcv(ticker="", exchange="US", period_end=datetime.datetime.
         "from": period_start.strftime('%Y-%m-%d') if period_start else (period_end - datetime.timedelta(days=period_days)).strftime('%Y-%m-%d'),
         "to": period_end.strftime('%Y-%m-%d')
     }
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url=url, params=params) as resp:
-            df = pd.DataFrame((await resp.json()))
-            df.rename(columns={"date": "datetime", "adjusted_close": "adj_close"}, inplace=True)
-            if len(df) > 0:
-                df["datetime"] = pd.to_datetime(df["datetime"])
-            return df
+    df = pd.DataFrame((await http_client.HttpClient().asyn_get_json(url, params=params)))
+    df.rename(columns={"date": "datetime", "adjusted_close": "adj_close"}, inplace=True)
+    if len(df) > 0:
+        df["datetime"] = pd.to_datetime(df["datetime"])
+    return df
 
-async def asyn_batch_get_ohlcv(tickers, exchanges, period_end=datetime.datetime.today(), period_start=None, period_days=3650):
+async def asyn_batch_get_ohlcv(tickers, exchanges, period_end=datetime.datetime.today(), period_start=None, period_days=3650, 
+                                period_starts=None, period_ends=None):
     urls = []
-    params = {
-        "api_token": os.getenv('EOD_KEY'), 
-        "fmt": "json",
-        "from": period_start.strftime('%Y-%m-%d') if period_start else (period_end - datetime.timedelta(days=period_days)).strftime('%Y-%m-%d'),
-        "to": period_end.strftime('%Y-%m-%d')
-    }
-    results = []
-    for ticker, exchange in zip(tickers, exchanges):
+    period_starts = period_starts if period_starts else [period_start for _ in range(len(tickers))]
+    period_ends = period_ends if period_ends else [period_end for _ in range(len(tickers))]
+    for ticker, exchange, start, end in zip(tickers, exchanges, period_starts, period_ends):
+        params = {
+            "api_token": os.getenv('EOD_KEY'), 
+            "fmt": "json",
+            "from": start.strftime('%Y-%m-%d') if start else (end - datetime.timedelta(days=period_days)).strftime('%Y-%m-%d'),
+            "to": end.strftime('%Y-%m-%d')
+        }
         url = "https://eodhistoricaldata.com/api/eod/{}.{}?".format(ticker, exchange)
         urls.append(url + urllib.parse.urlencode(params))
     results = await aiohttp_wrapper.async_aiohttp_get_all(urls)
@@ -80,7 +88,7 @@ def get_live_lagged_prices(ticker="", exchange="US"):
         "api_token": os.getenv('EOD_KEY'), 
         "fmt": "json"
     }
-    resp = requests.get(url, params=params)
+    resp = http_client.HttpClient().get(url, params=params)
     return resp.json()
 
 def get_intraday_data(ticker="", exchange="US", interval="5m", to_utc=datetime.datetime.utcnow(), period_days=120):
@@ -93,6 +101,6 @@ def get_intraday_data(ticker="", exchange="US", interval="5m", to_utc=datetime.d
         "from": calendar.timegm((to_utc - datetime.timedelta(days=period_days)).utctimetuple()),
         "to": calendar.timegm(to_utc.utctimetuple())
     }
-    resp = requests.get(url, params=params)
+    resp = http_client.HttpClient().get(url, params=params)
     df = pd.DataFrame(resp.json()).reset_index(drop=True).set_index("datetime")
     return df
\ No newline at end of file
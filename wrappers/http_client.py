@@ -0,0 +1,172 @@
+import time
+import atexit
+import asyncio
+import aiohttp
+import requests
+import threading
+import contextlib
+
+from requests.adapters import HTTPAdapter
+
+import db_logs
+
+class TokenBucket():
+    """
+    rate tokens per second refilled continuously up to capacity, shared by the sync and async paths
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        wait = self._take()
+        while wait > 0:
+            time.sleep(wait)
+            wait = self._take()
+
+    async def asyn_acquire(self):
+        wait = self._take()
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self._take()
+
+class HttpClient():
+    """
+    process wide http client for the eodhistoricaldata (and other) REST calls
+    sync calls share one keep-alive requests.Session, async calls share one aiohttp.ClientSession per event loop
+    every request goes through the same token bucket, tuned to the EOD quota of 1000 requests per minute
+    """
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._configure()
+            atexit.register(cls._instance._shutdown)
+        return cls._instance
+
+    def _configure(self, max_connections=100, max_concurrency=50, rate_per_minute=1000, burst=50, timeout=60):
+        self.max_connections = max_connections
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.limiter = TokenBucket(rate=rate_per_minute / 60, capacity=burst)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._asyn_session = None
+        self._asyn_loop = None
+        self._asyn_semaphore = None
+        self._asyn_closer = None
+        self._stale_asyn_sessions = []
+
+    @classmethod
+    def configure(cls, max_connections=100, max_concurrency=50, rate_per_minute=1000, burst=50, timeout=60):
+        client = cls()
+        client._shutdown()
+        client._configure(max_connections=max_connections, max_concurrency=max_concurrency,
+            rate_per_minute=rate_per_minute, burst=burst, timeout=timeout)
+        return client
+
+    """
+    Sync
+    """
+    def get(self, url, params=None, **kwargs):
+        self.limiter.acquire()
+        kwargs.setdefault("timeout", self.timeout)
+        return self._session.get(url, params=params, **kwargs)
+
+    def close(self):
+        self._session.close()
+
+    """
+    Async
+    """
+    def _get_asyn_session(self):
+        loop = asyncio.get_running_loop()
+        if self._asyn_session is None or self._asyn_session.closed or self._asyn_loop is not loop:
+            self._discard_asyn_session()
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=30)
+            self._asyn_session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._asyn_semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._asyn_loop = loop
+            self._asyn_closer = loop.create_task(HttpClient._close_with_loop(self._asyn_session))
+            db_logs.DBLogs().debug("opened shared aiohttp session")
+        return self._asyn_session
+
+    @staticmethod
+    async def _close_with_loop(session):
+        """
+        parked for the life of the session's loop, asyncio.run cancels it on shutdown and the session is closed on its own loop
+        """
+        try:
+            await asyncio.Event().wait()
+        finally:
+            if not session.closed:
+                await session.close()
+
+    def _discard_asyn_session(self):
+        if self._asyn_session is not None and not self._asyn_session.closed:
+            self._stale_asyn_sessions.append((self._asyn_session, self._asyn_loop, self._asyn_closer))
+        self._asyn_session, self._asyn_loop, self._asyn_semaphore, self._asyn_closer = None, None, None, None
+        self._close_stale_asyn_sessions()
+
+    def _close_stale_asyn_sessions(self):
+        """
+        sessions of asyncio.run loops are already closed by _close_with_loop, the ones of loops driven with
+        run_until_complete are closed on their own loop as soon as no loop is running in this thread (at the latest at exit)
+        """
+        try:
+            asyncio.get_running_loop()
+            return
+        except RuntimeError:
+            pass
+        remaining = []
+        for session, loop, closer in self._stale_asyn_sessions:
+            if session.closed:
+                continue
+            if loop.is_closed():
+                db_logs.DBLogs().warning("aiohttp session left open, its loop is closed")
+            elif loop.is_running():
+                remaining.append((session, loop, closer))
+            else:
+                closer.cancel()
+                loop.run_until_complete(asyncio.gather(closer, return_exceptions=True))
+                db_logs.DBLogs().debug("closed stale aiohttp session")
+        self._stale_asyn_sessions = remaining
+
+    @contextlib.asynccontextmanager
+    async def asyn_get(self, url, params=None, **kwargs):
+        session = self._get_asyn_session()
+        async with self._asyn_semaphore:
+            await self.limiter.asyn_acquire()
+            async with session.get(url, params=params, **kwargs) as resp:
+                yield resp
+
+    async def asyn_get_json(self, url, params=None, **kwargs):
+        async with self.asyn_get(url, params=params, **kwargs) as resp:
+            return await resp.json()
+
+    async def asyn_close(self):
+        if self._asyn_closer is not None:
+            self._asyn_closer.cancel()
+        if self._asyn_session is not None and not self._asyn_session.closed:
+            await self._asyn_session.close()
+        self._asyn_session, self._asyn_loop, self._asyn_semaphore, self._asyn_closer = None, None, None, None
+
+    def _shutdown(self):
+        self._discard_asyn_session()
+        self.close()